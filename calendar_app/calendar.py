@@ -1,32 +1,595 @@
-from typing import Optional, List, Dict
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict, Callable, Iterator, Tuple
+import os
 import sqlite3
 from dateutil import parser as dateparser
 
-from .db import init_db, add_event as db_add_event, list_events as db_list_events, remove_event as db_remove_event
+from .db import (
+    init_db,
+    connect_read_only,
+    add_event as db_add_event,
+    list_events as db_list_events,
+    list_events_between as db_list_events_between,
+    search_events as db_search_events,
+    day_counts as db_day_counts,
+    hour_counts as db_hour_counts,
+    length_totals as db_length_totals,
+    remove_event as db_remove_event,
+    get_events,
+    update_events as db_update_events,
+    archive_path,
+    list_archives,
+    years_before,
+    attach_database,
+    detach_database,
+    move_events,
+    register_archive,
+    vacuum,
+    put_event,
+    fingerprint,
+    data_version,
+    changes_since as db_changes_since,
+    upsert_event,
+    apply_tombstone,
+    record_tombstone,
+    find_uids,
+    unarchive_events,
+)
+
+# SQLite allows 10 attached databases by default; stay well below that
+MAX_ATTACHED_ARCHIVES = 8
+
+
+@contextmanager
+def _savepoint(conn: sqlite3.Connection) -> Iterator[None]:
+    """Undo only the writes made inside the block if it raises."""
+    if not conn.in_transaction:
+        # Nothing written yet, so a plain rollback undoes exactly this block.
+        # (Opening a savepoint here would start a transaction, after which
+        # archives could no longer be attached.)
+        try:
+            yield
+        except BaseException:
+            conn.rollback()
+            raise
+        return
+    conn.execute("SAVEPOINT nested")
+    try:
+        yield
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK TO nested")
+            conn.execute("RELEASE nested")
+        raise
+    conn.execute("RELEASE nested")
 
 
 class Calendar:
-    def __init__(self, db_path: str = ":memory:"):
-        self.conn = init_db(db_path)
+    def __init__(self, db_path: str = ":memory:", replica: bool = False, check_same_thread: bool = True,
+                 read_only: bool = False):
+        self.db_path = db_path
+        # read_only opens an existing file as-is, for short-lived readers
+        self.read_only = read_only
+        if read_only:
+            self.conn = connect_read_only(db_path, check_same_thread)
+        else:
+            self.conn = init_db(db_path, check_same_thread)
+        # Optional in-memory copy of the database that serves all reads.
+        # Writes go to disk first and are then mirrored into it.
+        self.replica: Optional[sqlite3.Connection] = None
+        # data_version of self.conn when the replica was last copied
+        self._replica_version: Optional[int] = None
+        if replica and db_path != ":memory:":
+            self.replica = sqlite3.connect(":memory:")
+            self.refresh_replica()
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        # Inside transaction(): nothing is committed and listeners are only
+        # told about changes once the whole block has been committed.
+        self._in_transaction = False
+        self._pending: List[Tuple[str, Dict]] = []
+        # Archived years currently attached to self.conn: year -> schema alias
+        self._attached: "OrderedDict[int, str]" = OrderedDict()
+
+    def add_listener(self, callback: Callable[[str, Dict], None]) -> None:
+        """Register callback(action, event) to be called after every change.
+
+        action is "add", "update" or "remove". Callbacks run on the thread that made
+        the change, so they should only hand the event off, not block.
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, Dict], None]) -> None:
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    @contextmanager
+    def transaction(self) -> Iterator["Calendar"]:
+        """Group many changes into a single commit; rolls back on error.
+
+        Nested blocks join the outer transaction, but an error rolls back
+        just the nested block (through a savepoint), so one failed step of a
+        batch does not leave half of its writes in the final commit.
+        """
+        if self._in_transaction:
+            mark = len(self._pending)
+            try:
+                with _savepoint(self.conn), _savepoint(self.replica) if self.replica else nullcontext():
+                    yield self
+            except BaseException:
+                del self._pending[mark:]
+                raise
+            return
+        self._in_transaction = True
+        try:
+            yield self
+            self.conn.commit()
+            if self.replica:
+                self.replica.commit()
+        except BaseException:
+            self.conn.rollback()
+            self._pending = []
+            # The replica already saw the rolled back writes; copy disk again
+            if self.replica:
+                self.replica.rollback()
+                self.refresh_replica()
+            raise
+        finally:
+            self._in_transaction = False
+        pending, self._pending = self._pending, []
+        for action, event in pending:
+            self._notify(action, event)
+
+    def _notify(self, action: str, event: Dict) -> None:
+        if self._in_transaction:
+            self._pending.append((action, event))
+            return
+        for callback in list(self._listeners):
+            callback(action, event)
 
     def add_event(self, title: str, start: str, end: Optional[str] = None, description: Optional[str] = None) -> int:
         # Normalize datetimes to ISO strings
         start_iso = self._to_iso(start)
         end_iso = self._to_iso(end) if end else None
-        return db_add_event(self.conn, title, start_iso, end_iso, description)
+        eid = db_add_event(self.conn, title, start_iso, end_iso, description, commit=not self._in_transaction)
+        event = {"id": eid, "title": title, "start": start_iso, "end": end_iso, "description": description}
+        if self.replica:
+            put_event(self.replica, event, commit=not self._in_transaction)
+        self._notify("add", event)
+        return eid
 
     def list_events(self, date: Optional[str] = None) -> List[Dict]:
         # if date provided, expect YYYY-MM-DD or parseable and pass prefix
         if date:
             d = self._to_date_str(date)
-            return db_list_events(self.conn, d)
-        return db_list_events(self.conn, None)
+            year = int(d[:4])
+            return self._across_archives(year, year, lambda conn, schema: db_list_events(conn, d, schema))
+        return self._across_archives(None, None, lambda conn, schema: db_list_events(conn, None, schema))
+
+    def list_events_between(self, start: str, end: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """List events starting at or after start and before end (if given)."""
+        start_iso = self._to_iso(start)
+        end_iso = self._to_iso(end) if end else None
+        return self._across_archives(
+            int(start_iso[:4]), int(end_iso[:4]) if end_iso else None,
+            lambda conn, schema: db_list_events_between(conn, start_iso, end_iso, limit, schema), limit,
+        )
+
+    def search_events(self, terms: List[str], since: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Find events whose title contains any of the given words."""
+        since_iso = self._to_iso(since) if since else None
+        return self._across_archives(
+            int(since_iso[:4]) if since_iso else None, None,
+            lambda conn, schema: db_search_events(conn, terms, since_iso, limit, schema), limit,
+        )
+
+    def day_counts(self, year: int) -> Dict[str, int]:
+        """Return {YYYY-MM-DD: number of events} for every busy day of year."""
+        start, end = f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+        counts = db_day_counts(self._reader, start, end)
+        for y, path in self._archives(year, year):
+            with self._archive(y, path) as (conn, schema):
+                for day, n in db_day_counts(conn, start, end, schema).items():
+                    counts[day] = counts.get(day, 0) + n
+        return counts
+
+    def schedule_totals(self, start: Optional[str] = None, end: Optional[str] = None) -> Dict:
+        """Aggregates behind stats.ScheduleStats for events starting in [start, end).
+
+        {"hours": 24 counts, "days": {YYYY-MM-DD: count} for the whole days
+        in range, "minutes": total length of events that have an end,
+        "with_end": how many do}. Archives in range are included.
+        """
+        start_iso = self._to_iso(start) if start else None
+        end_iso = self._to_iso(end) if end else None
+        totals = {"hours": [0] * 24, "days": {}, "minutes": 0.0, "with_end": 0}
+
+        def add(conn: sqlite3.Connection, schema: str) -> None:
+            totals["hours"] = [a + b for a, b in zip(totals["hours"], db_hour_counts(conn, start_iso, end_iso, schema))]
+            for day, n in db_day_counts(conn, start_iso[:10] if start_iso else "", end_iso[:10] if end_iso else "9999-99",
+                                        schema).items():
+                totals["days"][day] = totals["days"].get(day, 0) + n
+            minutes, n = db_length_totals(conn, start_iso, end_iso, schema)
+            totals["minutes"] += minutes
+            totals["with_end"] += n
+
+        add(self._reader, "main")
+        for y, path in self._archives(int(start_iso[:4]) if start_iso else None, int(end_iso[:4]) if end_iso else None):
+            with self._archive(y, path) as (conn, schema):
+                add(conn, schema)
+        return totals
 
     def remove_event(self, event_id: int) -> bool:
-        return db_remove_event(self.conn, event_id)
+        if get_events(self.conn, [event_id]):
+            ok = db_remove_event(self.conn, event_id, commit=not self._in_transaction)
+            if ok and self.replica:
+                db_remove_event(self.replica, event_id, commit=not self._in_transaction)
+        else:
+            # The event may have been archived. It is located before anything
+            # is written, so its file can still join self.conn's transaction.
+            ok = False
+            for y, (path, _) in self._locate_archived([event_id]).items():
+                with self._archive(y, path, write=True) as (conn, schema):
+                    ok = db_remove_event(conn, event_id, commit=False, schema=schema)
+                    # The archive's own tombstone is invisible to changes_since
+                    record_tombstone(self.conn, event_id, schema)
+                if not self._in_transaction:
+                    self.conn.commit()
+        if ok:
+            self._notify("remove", {"id": event_id})
+        return ok
+
+    def get_event(self, event_id: int) -> Optional[Dict]:
+        """Return one event by id (from the main file or its archive), or None."""
+        found = self._find_events([event_id])
+        return found[0] if found else None
+
+    def update_event(self, event_id: int, **fields) -> Optional[Dict]:
+        """Edit some of title/start/end/description in place, keeping the id.
+
+        Only the columns that actually change are written. Returns the event
+        as it is now, or None if there is no such event.
+        """
+        updated = self.update_events({event_id: fields})
+        return updated[0] if updated else None
+
+    def update_events(self, updates: Dict[int, Dict]) -> List[Dict]:
+        """Apply {id: fields} edits (as in update_event) in one transaction.
+
+        Returns the edited events that were found; unknown ids are skipped.
+        """
+        wanted = {eid: self._normalize_fields(fields) for eid, fields in updates.items()}
+        result: List[Dict] = []
+        with self.transaction():
+            current = get_events(self.conn, list(wanted))
+            # Find archived ids before writing anything, while their files
+            # can still be attached to self.conn, and edit those first: if
+            # one cannot join the transaction, nothing has been written yet
+            archived = self._locate_archived([eid for eid in wanted if eid not in current])
+            for y, (path, events) in archived.items():
+                result.extend(self._update_archived(y, path, events, wanted))
+            changes = []
+            for eid, old in current.items():
+                diff = {k: v for k, v in wanted[eid].items() if old[k] != v}
+                if diff:
+                    changes.append((eid, diff))
+                    self._notify("update", dict(old, **diff))
+                result.append(dict(old, **diff))
+            db_update_events(self.conn, changes, commit=False)
+            if self.replica is not None:
+                db_update_events(self.replica, changes, commit=False)
+        order = {eid: i for i, eid in enumerate(wanted)}
+        result.sort(key=lambda e: order[e["id"]])
+        return result
+
+    def attach_archives(self, event_ids: List[int]) -> None:
+        """Attach the archives that hold any of event_ids.
+
+        Call before transaction() when it will change archived events after
+        other writes; otherwise those changes are refused.
+        """
+        if not self.conn.in_transaction:
+            in_main = get_events(self.conn, event_ids)
+            self._locate_archived([eid for eid in event_ids if eid not in in_main])
+
+    def shift_events(self, event_ids: List[int], delta: timedelta) -> int:
+        """Move the start (and end) of every listed event by delta, in one transaction.
+
+        Returns the number of events moved.
+        """
+        updates = {}
+        for event in self._find_events(event_ids):
+            fields = {"start": (datetime.fromisoformat(event["start"]) + delta).isoformat()}
+            if event["end"]:
+                fields["end"] = (datetime.fromisoformat(event["end"]) + delta).isoformat()
+            updates[event["id"]] = fields
+        return len(self.update_events(updates))
+
+    def archive_before(self, year: int) -> int:
+        """Move events that start before Jan 1 of year into per-year files.
+
+        Each year goes to its own database (see db.archive_path) that is only
+        attached when a query reaches that year. The main file is vacuumed
+        afterwards. Returns the number of events moved.
+        """
+        if self.db_path == ":memory:":
+            raise ValueError("archiving needs an on-disk database")
+        if self._in_transaction:
+            raise ValueError("cannot archive inside a transaction")
+        self.conn.commit()
+        moved = 0
+        for y in years_before(self.conn, f"{year:04d}-01-01"):
+            path = archive_path(self.db_path, y)
+            init_db(path).close()
+            with self._archive(y, path, write=True) as (conn, schema):
+                moved += move_events(self.conn, schema, f"{y:04d}-01-01", f"{y + 1:04d}-01-01")
+                register_archive(self.conn, y, os.path.basename(path))
+                self.conn.commit()
+        # Leave the archives detached until a query actually reaches them
+        self._detach_archives()
+        if moved:
+            vacuum(self.conn)
+            if self.replica:
+                self.refresh_replica()
+        return moved
+
+    def changes_since(self, token: Optional[str] = None, limit: Optional[int] = None) -> Dict:
+        """Return what changed in the main file after token.
+
+        Result: {"token": str, "upserts": [event rows with created_at/updated_at],
+        "deletes": [{"id", "deleted_at"}]}. Pass the returned token next time
+        to get only newer changes; None starts from the beginning. With limit,
+        call again until both lists come back empty.
+        """
+        updated_after, deleted_after = self._parse_token(token)
+        rows, tombstones = db_changes_since(self.conn, updated_after, deleted_after, limit)
+        if rows:
+            updated_after = (rows[-1]["updated_at"], rows[-1]["id"])
+        if tombstones:
+            deleted_after = (tombstones[-1]["deleted_at"], tombstones[-1]["id"])
+        new_token = f"{updated_after[0]}|{updated_after[1]}|{deleted_after[0]}|{deleted_after[1]}"
+        return {"token": new_token, "upserts": rows, "deletes": tombstones}
+
+    def apply_changes(self, changes: Dict) -> Dict[str, int]:
+        """Apply a change set from changes_since() of another copy of this calendar.
+
+        Events are matched by uid and the later edit wins, so this is meant
+        for copies of the same calendar, not for combining unrelated ones.
+        Ids are local: an event added elsewhere keeps its id here only if
+        that id is unused. Archived events a change wins over come back into
+        the main file first, as when they are edited locally.
+        """
+        applied = {"upserts": 0, "deletes": 0}
+        upserts = changes.get("upserts", [])
+        deletes = [t for t in changes.get("deletes", []) if t.get("uid")]
+        with self.transaction():
+            # Located before anything is written, so the archives can be attached
+            archived = self._locate_archived([r["uid"] for r in upserts] + [t["uid"] for t in deletes], find_uids)
+            edited = {r["uid"]: r.get("edited_at") or r["updated_at"] for r in upserts}
+            deleted = {t["uid"]: t["deleted_at"] for t in deletes}
+            for y, (path, found) in archived.items():
+                # Same rules as upsert_event and apply_tombstone
+                ids = [local["id"] for uid, local in found.items()
+                       if local["edited_at"] is None or edited.get(uid, "") > local["edited_at"]
+                       or local["edited_at"] <= deleted.get(uid, "")]
+                if ids:
+                    with self._archive(y, path, write=True) as (conn, schema):
+                        unarchive_events(conn, schema, ids)
+            for row in upserts:
+                result = upsert_event(self.conn, row)
+                if result:
+                    action, eid = result
+                    applied["upserts"] += 1
+                    event = dict({k: row.get(k) for k in ("title", "start", "end", "description")}, id=eid)
+                    if self.replica is not None:
+                        put_event(self.replica, event, commit=False)
+                    self._notify(action, event)
+            for tombstone in changes.get("deletes", []):
+                eid = apply_tombstone(self.conn, tombstone)
+                if eid is not None:
+                    applied["deletes"] += 1
+                    if self.replica is not None:
+                        db_remove_event(self.replica, eid, commit=False)
+                    self._notify("remove", {"id": eid})
+        return applied
+
+    def merge_from(self, db_path: str, token: Optional[str] = None) -> str:
+        """Pull changes made in another calendar.db since token; returns the next token."""
+        if not os.path.isfile(db_path):
+            raise FileNotFoundError(f"no calendar database at {db_path}")
+        # Only read the other file: no schema setup, nothing written to it
+        other = Calendar(db_path, read_only=True)
+        try:
+            changes = other.changes_since(token)
+        except sqlite3.OperationalError as e:
+            raise ValueError(f"cannot read changes from {db_path} (written by an older version?): {e}")
+        finally:
+            other.conn.close()
+        self.apply_changes(changes)
+        return changes["token"]
+
+    @staticmethod
+    def _parse_token(token: Optional[str]) -> Tuple[tuple, tuple]:
+        if not token:
+            return ("", 0), ("", 0)
+        try:
+            upd_ts, upd_id, del_ts, del_id = token.split("|")
+            return (upd_ts, int(upd_id)), (del_ts, int(del_id))
+        except ValueError:
+            raise ValueError(f"invalid change token: {token!r}")
+
+    @property
+    def _reader(self) -> sqlite3.Connection:
+        """Connection that serves reads of the main file: the replica if enabled."""
+        return self.replica if self.replica is not None else self.conn
+
+    def refresh_replica(self) -> None:
+        """Copy the on-disk database into the in-memory replica."""
+        if self.replica is None:
+            return
+        self.conn.commit()
+        # Read before copying: a commit in between is then copied and also
+        # triggers one harmless extra refresh, rather than being missed
+        self._replica_version = data_version(self.conn)
+        self.conn.backup(self.replica)
+
+    def data_version(self) -> int:
+        """A number that changes whenever another connection commits to the file."""
+        return data_version(self.conn)
+
+    def check_replica(self) -> bool:
+        """Compare the replica with disk; re-copy it and return False if they differ.
+
+        Catches changes made to calendar.db by other processes (including
+        edits that leave row counts and sizes unchanged) and any drift in
+        what this process mirrored.
+        """
+        if self.replica is None or self._in_transaction:
+            return True
+        if data_version(self.conn) == self._replica_version and fingerprint(self.replica) == fingerprint(self.conn):
+            return True
+        self.refresh_replica()
+        return False
+
+    def _normalize_fields(self, fields: Dict) -> Dict:
+        unknown = set(fields) - {"title", "start", "end", "description"}
+        if unknown:
+            raise ValueError(f"unknown event field(s): {', '.join(sorted(unknown))}")
+        out = dict(fields)
+        if "title" in out:
+            out["title"] = (out["title"] or "").strip()
+            if not out["title"]:
+                raise ValueError("title cannot be empty")
+        if "start" in out:
+            if not out["start"]:
+                raise ValueError("start cannot be empty")
+            out["start"] = self._to_iso(out["start"])
+        if "end" in out:
+            out["end"] = self._to_iso(out["end"]) if out["end"] else None
+        return out
+
+    def _find_events(self, event_ids: List[int]) -> List[Dict]:
+        """Current rows of event_ids, from the main file or their archive."""
+        found = get_events(self._reader, event_ids)
+        for _, events in self._locate_archived([eid for eid in event_ids if eid not in found]).values():
+            found.update(events)
+        return [found[eid] for eid in event_ids if eid in found]
+
+    def _locate_archived(self, event_ids: List, lookup=get_events) -> Dict[int, Tuple[str, Dict]]:
+        """{year: (path, {id: event})} for those of event_ids that live in an archive.
+
+        lookup(conn, keys, schema) -> {key: row} finds them in one file;
+        pass db.find_uids to look up uids instead of ids. Outside a write
+        transaction this also attaches the archives it finds, so a following
+        edit can run on self.conn.
+        """
+        located: Dict[int, Tuple[str, Dict]] = {}
+        missing = list(event_ids)
+        for y, path in self._archives(None, None) if missing else []:
+            with self._archive(y, path) as (conn, schema):
+                events = lookup(conn, missing, schema)
+            if events:
+                located[y] = (path, events)
+                missing = [eid for eid in missing if eid not in events]
+                if not missing:
+                    break
+        return located
+
+    def _update_archived(self, year: int, path: str, current: Dict[int, Dict], wanted: Dict[int, Dict]) -> List[Dict]:
+        """Edit events that live in the archive of year (called inside a transaction).
+
+        Edited events move back into the main file: that is where the change
+        feed looks, and where queries for a new date outside year will look.
+        The next archive_before() moves them out again.
+        """
+        result: List[Dict] = []
+        changes = []
+        for eid, old in current.items():
+            diff = {k: v for k, v in wanted[eid].items() if old[k] != v}
+            event = dict(old, **diff)
+            result.append(event)
+            if diff:
+                changes.append((eid, diff))
+                self._notify("update", event)
+        if changes:
+            with self._archive(year, path, write=True) as (conn, schema):
+                unarchive_events(conn, schema, [eid for eid, _ in changes])
+            db_update_events(self.conn, changes, commit=False)
+            if self.replica is not None:
+                # Only the changed events moved into the main file; the rest stay archived
+                moved = {eid for eid, _ in changes}
+                for event in result:
+                    if event["id"] in moved:
+                        put_event(self.replica, event, commit=False)
+        return result
+
+    def _detach_archives(self) -> None:
+        while self._attached:
+            _, alias = self._attached.popitem(last=False)
+            detach_database(self.conn, alias)
+
+    def _archives(self, first_year: Optional[int], last_year: Optional[int]) -> List[Tuple[int, str]]:
+        folder = os.path.dirname(os.path.abspath(self.db_path)) if self.db_path != ":memory:" else ""
+        return [(y, os.path.join(folder, name)) for y, name in list_archives(self._reader, first_year, last_year).items()]
+
+    @contextmanager
+    def _archive(self, year: int, path: str, write: bool = False) -> Iterator[Tuple[sqlite3.Connection, str]]:
+        """Yield (connection, schema) for the archive of year.
+
+        The file is ATTACHed to self.conn on first use and kept attached
+        (least recently used ones are detached past MAX_ATTACHED_ARCHIVES).
+        SQLite cannot attach inside an open transaction, so in that case a
+        read opens the file on a short-lived connection of its own. A write
+        is refused instead: it would commit on its own and could not be
+        rolled back with the rest of the transaction.
+        """
+        alias = self._attached.get(year)
+        if alias:
+            self._attached.move_to_end(year)
+            yield self.conn, alias
+            return
+        if self.conn.in_transaction:
+            if write:
+                raise ValueError(f"cannot change archived events of {year} after other changes in the same "
+                                 "transaction; change archived events first")
+            conn = sqlite3.connect(path)
+            try:
+                yield conn, "main"
+            finally:
+                conn.close()
+            return
+        if len(self._attached) >= MAX_ATTACHED_ARCHIVES:
+            _, old_alias = self._attached.popitem(last=False)
+            detach_database(self.conn, old_alias)
+        alias = f"archive_{year}"
+        # Brings archives written by older versions up to the current schema
+        if not self.read_only:
+            init_db(path).close()
+        attach_database(self.conn, path, alias)
+        self._attached[year] = alias
+        yield self.conn, alias
+
+    def _across_archives(self, first_year: Optional[int], last_year: Optional[int], query,
+                         limit: Optional[int] = None) -> List[Dict]:
+        """Run query(conn, schema) on the main file and every archive in range."""
+        rows = query(self._reader, "main")
+        archives = self._archives(first_year, last_year)
+        if not archives:
+            return rows
+        for y, path in archives:
+            with self._archive(y, path) as (conn, schema):
+                rows.extend(query(conn, schema))
+        rows.sort(key=lambda e: e["start"])
+        return rows[:limit] if limit is not None else rows
 
     def _to_iso(self, text: str) -> str:
-        dt = dateparser.parse(text)
+        try:
+            # Already ISO (e.g. times computed by shift_events): skip dateutil,
+            # which is far slower and dominates bulk edits
+            dt = datetime.fromisoformat(text)
+        except ValueError:
+            dt = dateparser.parse(text)
         return dt.isoformat()
 
     def _to_date_str(self, text: str) -> str:
@@ -1,18 +1,18 @@
 import re
-import requests
-import json 
+import threading
 
-from typing import Tuple
+from datetime import timedelta
+from typing import Callable, Dict, Tuple, Optional, List
 
-from .calendar import Calendar
+from dateutil import parser as dateparser
 
+from .calendar import Calendar
+from .llm import LLMRequestManager, LLMCancelled, INTERACTIVE, BACKGROUND, shared_manager
+from .retrieval import build_context
+from .stats import ScheduleStats, format_hours, format_weekdays, format_length
 
-class ChatBot:
-    def __init__(self, calendar: Calendar):
-        self.calendar = calendar
 
-    def ask_llm(self, prompt: str) -> str:
-        prompt_for_llama = """ 
+SYSTEM_PROMPT = """ 
         - You are a helpful chatbot inside a calendar application
         - Always respond in three sentences or less 
 
@@ -23,49 +23,154 @@ class ChatBot:
             - list\n
             - list on YYYY-MM-DD\n
             - remove <id> 
+            - edit <id> [title <text>] [on YYYY-MM-DD] [at HH:MM]
+            - shift <id>[,<id>...] by [-]N minutes|hours|days
+            - archive before YYYY
+            - stats [hours|weekdays|length] [from YYYY-MM-DD to YYYY-MM-DD]
+            - reset
             - help
         """
-        url = "http://localhost:11434/api/generate"
-        headers = {"Content-Type": "application/json"}
-        data = {"model": "llama3.2:1b", "prompt": prompt_for_llama + "\nUser: " + prompt, "stream": True}
-
-        response = requests.post(url, headers=headers, json=data, stream=True)
-
-        output = ""
-        for line in response.iter_lines():
-            if line:
-                try:
-                    obj = json.loads(line.decode("utf-8"))
-                    output += obj.get("response", "")
-                except json.JSONDecodeError:
-                    continue
-        
+
+
+class ChatBot:
+    def __init__(self, calendar: Calendar, model: str = "llama3.2:1b",
+                 keep_alive: str = "30m", max_context: int = 4096,
+                 llm: Optional[LLMRequestManager] = None, session: Optional[str] = None,
+                 retrieval_tokens: int = 300, llm_enabled: bool = True):
+        self.calendar = calendar
+        self.model = model
+        # Generations go through a manager shared by every bot in the process
+        self.llm = llm or shared_manager()
+        self.session = session or f"chatbot-{id(self)}"
+        # How long Ollama keeps the model loaded after a request
+        self.keep_alive = keep_alive
+        # Token ids Ollama returned for the conversation so far. The system
+        # prompt is already encoded in it, so it is only sent on a fresh start.
+        self.max_context = max_context
+        self._context: Optional[List[int]] = None
+        # Budget for calendar events quoted into each LLM prompt (0 disables)
+        self.retrieval_tokens = retrieval_tokens
+        # When False, anything that is not a command is rejected instead of
+        # being sent to the LLM (used by batch mode)
+        self.llm_enabled = llm_enabled
+        # Whether the last respond() call succeeded
+        self.last_ok = True
+
+    def reset_context(self) -> None:
+        """Forget the conversation; the next request starts from the system prompt."""
+        self._context = None
+
+    def warm_up(self) -> threading.Thread:
+        """Load the model in the background so the first reply does not pay for it."""
+        def _load():
+            try:
+                # An empty prompt makes Ollama load the model without generating
+                self.llm.generate({"model": self.model, "prompt": "", "keep_alive": self.keep_alive},
+                                  priority=BACKGROUND)
+            except Exception:
+                pass
+
+        t = threading.Thread(target=_load, name="llm-warm-up", daemon=True)
+        t.start()
+        return t
+
+    def ask_llm(self, prompt: str) -> str:
+        """Ask the LLM; raises LLMCancelled if a newer message from this session supersedes it."""
+        return self._generate(self._llm_payload(prompt))
+
+    def _llm_payload(self, prompt: str) -> Dict:
+        # Reads the calendar, so it runs on the thread that owns its connection
+        data = {"model": self.model, "stream": True, "keep_alive": self.keep_alive}
+        user_turn = "User: " + prompt
+        try:
+            events = build_context(self.calendar, prompt, self.retrieval_tokens)
+        except Exception:
+            events = ""
+        if events:
+            user_turn = "Calendar events relevant to the question:\n" + events + "\n" + user_turn
+        if self._context:
+            data["prompt"] = user_turn
+            data["context"] = self._context
+        else:
+            data["prompt"] = SYSTEM_PROMPT + "\n" + user_turn
+        return data
+
+    def _generate(self, data: Dict) -> str:
+        output, context = self.llm.generate(data, session=self.session, priority=INTERACTIVE)
+        self._remember_context(context)
         return output
 
+    def _remember_context(self, context: Optional[List[int]]) -> None:
+        # Start over once the conversation outgrows the bound
+        if context and len(context) <= self.max_context:
+            self._context = context
+        else:
+            self._context = None
+
     def respond(self, text: str) -> str:
-        text = text.strip()
-        
+        reply, self.last_ok = self.begin(text)()
+        return reply
+
+    def begin(self, text: str) -> Callable[[], Tuple[str, bool]]:
+        """Start answering text; returns finish() -> (reply, ok).
+
+        Commands, and anything else that reads the calendar, run here on the
+        calling thread. finish() only waits for the LLM, so front ends can
+        call it on a worker thread and stay responsive; a newer message from
+        this bot cancels a generation still streaming, whose finish() then
+        returns a "skipped" reply.
+        """
+        reply = self._command(text)
+        if reply is not None:
+            ok = self.last_ok
+            return lambda: (reply, ok)
+        data = self._llm_payload(text.strip())
+
+        def finish() -> Tuple[str, bool]:
+            try:
+                return self._generate(data), True
+            except LLMCancelled:
+                return "(Skipped: a newer message replaced this one.)", False
+            except Exception:
+                return "Sorry, I didn't understand. Type 'help' for examples.", False
 
+        return finish
+
+    def _command(self, text: str) -> Optional[str]:
+        """Reply to text if it is a command; None means it is for the LLM."""
         text = text.strip()
+        self.last_ok = True
         if not text:
-            return "I didn't get that. Type 'help' for commands."
+            return self._fail("I didn't get that. Type 'help' for commands.")
 
         low = text.lower()
         if low.startswith("help"):
             return self._help_text()
+        if low == "reset":
+            self.reset_context()
+            return "Conversation reset."
         if low.startswith("add "):
             return self._handle_add(text[4:].strip())
         if low.startswith("list"):
             return self._handle_list(text[4:].strip())
         if low.startswith("remove") or low.startswith("delete"):
             return self._handle_remove(text)
-        
-        try:
-            reply = self.ask_llm(text)
-        except: 
-            reply = "Sorry, I didn't understand. Type 'help' for examples.f"
+        if low.startswith("edit"):
+            return self._handle_edit(text)
+        if low.startswith("shift"):
+            return self._handle_shift(text)
+        if low.startswith("archive"):
+            return self._handle_archive(text)
+        if low.startswith("stats"):
+            return self._handle_stats(text)
+        if not self.llm_enabled:
+            return self._fail("Unknown command. Type 'help' for commands.")
+        return None
 
-        return reply
+    def _fail(self, message: str) -> str:
+        """Mark the current command as failed and return its message."""
+        self.last_ok = False
+        return message
 
     def _help_text(self) -> str:
         return (
@@ -75,6 +180,12 @@ class ChatBot:
             "- list\n"
             "- list on YYYY-MM-DD\n"
             "- remove <id>\n"
+            "- edit <id> [title <text>] [on YYYY-MM-DD] [at HH:MM]\n"
+            "  e.g. edit 3 at 15:30 (keeps the same id)\n"
+            "- shift <id>[,<id>...] by [-]N minutes|hours|days\n"
+            "- archive before YYYY (move older events to yearly files)\n"
+            "- stats [hours|weekdays|length] [from YYYY-MM-DD to YYYY-MM-DD]\n"
+            "- reset (forget the conversation)\n"
             "- help\n"
         )
 
@@ -90,7 +201,7 @@ class ChatBot:
                 eid = self.calendar.add_event(title, when)
                 return f"Added event #{eid}: {title} at {when}"
             except Exception as e:
-                return f"Failed to add event: {e}"
+                return self._fail(f"Failed to add event: {e}")
 
         # Fallback: if body starts with a date first
         m2 = re.match(r"(?P<date>\S+) (?P<title>.+)", body)
@@ -101,9 +212,9 @@ class ChatBot:
                 eid = self.calendar.add_event(title, date)
                 return f"Added event #{eid}: {title} at {date}"
             except Exception as e:
-                return f"Failed to add event: {e}"
+                return self._fail(f"Failed to add event: {e}")
 
-        return "Could not parse add command. Try: add Meeting on 2025-11-20 at 14:00"
+        return self._fail("Could not parse add command. Try: add Meeting on 2025-11-20 at 14:00")
 
     def _handle_list(self, body: str) -> str:
         body = body.strip()
@@ -127,7 +238,89 @@ class ChatBot:
     def _handle_remove(self, text: str) -> str:
         m = re.search(r"(remove|delete)\s+(?P<id>\d+)", text, re.IGNORECASE)
         if not m:
-            return "Usage: remove <id>\nUse 'list' to see ids."
+            return self._fail("Usage: remove <id>\nUse 'list' to see ids.")
         eid = int(m.group("id"))
         ok = self.calendar.remove_event(eid)
-        return "Removed." if ok else "Event not found."
+        return "Removed." if ok else self._fail("Event not found.")
+
+    def _handle_edit(self, text: str) -> str:
+        m = re.match(r"edit\s+#?(?P<id>\d+)(?:\s+title\s+(?P<title>.+?))?"
+                     r"(?:\s+on\s+(?P<date>\S+))?(?:\s+at\s+(?P<time>\S+))?\s*$", text, re.IGNORECASE)
+        if not m or not (m.group("title") or m.group("date") or m.group("time")):
+            return self._fail("Usage: edit <id> [title <text>] [on YYYY-MM-DD] [at HH:MM]")
+        eid = int(m.group("id"))
+        fields = {}
+        if m.group("title"):
+            fields["title"] = m.group("title")
+        try:
+            date, time = m.group("date"), m.group("time")
+            if date or time:
+                old = self.calendar.get_event(eid)
+                if old is None:
+                    return self._fail("Event not found.")
+                when = dateparser.parse(old["start"])
+                if date:
+                    when = dateparser.parse(date, default=when)
+                if time:
+                    when = dateparser.parse(time, default=when)
+                fields["start"] = when.isoformat()
+                if old["end"]:
+                    # Keep the duration when the event moves
+                    fields["end"] = (when + (dateparser.parse(old["end"]) - dateparser.parse(old["start"]))).isoformat()
+            event = self.calendar.update_event(eid, **fields)
+        except Exception as e:
+            return self._fail(f"Failed to edit event: {e}")
+        if event is None:
+            return self._fail("Event not found.")
+        return f"Updated event #{eid}: {event['title']} at {event['start']}"
+
+    def _handle_shift(self, text: str) -> str:
+        m = re.match(r"shift\s+(?P<ids>#?\d+(?:\s*,\s*#?\d+)*)\s+by\s+(?P<n>[+-]?\d+)\s*"
+                     r"(?P<unit>minutes?|mins?|hours?|h|days?|d)\s*$", text, re.IGNORECASE)
+        if not m:
+            return self._fail("Usage: shift <id>[,<id>...] by [-]N minutes|hours|days")
+        ids = [int(i.strip().lstrip("#")) for i in m.group("ids").split(",")]
+        unit = m.group("unit").lower()[0]
+        n = int(m.group("n"))
+        delta = {"m": timedelta(minutes=n), "h": timedelta(hours=n), "d": timedelta(days=n)}[unit]
+        try:
+            moved = self.calendar.shift_events(ids, delta)
+        except Exception as e:
+            return self._fail(f"Failed to shift events: {e}")
+        if not moved:
+            return self._fail("Event not found.")
+        return f"Moved {moved} event{'s' if moved != 1 else ''}."
+
+    def _handle_archive(self, text: str) -> str:
+        m = re.search(r"archive\s+before\s+(?P<year>\d{4})\b", text, re.IGNORECASE)
+        if not m:
+            return self._fail("Usage: archive before YYYY")
+        year = int(m.group("year"))
+        try:
+            moved = self.calendar.archive_before(year)
+        except Exception as e:
+            return self._fail(f"Failed to archive: {e}")
+        return f"Archived {moved} event{'s' if moved != 1 else ''} from before {year}."
+
+    def _handle_stats(self, text: str) -> str:
+        m = re.match(r"stats(?:\s+(?P<kind>hours|weekdays|length))?"
+                     r"(?:\s+from\s+(?P<start>\S+)\s+to\s+(?P<end>\S+))?\s*$", text, re.IGNORECASE)
+        if not m:
+            return self._fail("Usage: stats [hours|weekdays|length] [from YYYY-MM-DD to YYYY-MM-DD]")
+        start, end = m.group("start"), m.group("end")
+        try:
+            if end:
+                # "to" is inclusive; the query end is exclusive
+                end = (dateparser.parse(end) + timedelta(days=1)).date().isoformat()
+            stats = ScheduleStats.load(self.calendar, start, end)
+        except Exception as e:
+            return self._fail(f"Failed to compute stats: {e}")
+        kind = (m.group("kind") or "").lower()
+        parts = []
+        if kind in ("", "hours"):
+            parts.append(format_hours(stats.hour_histogram()))
+        if kind in ("", "weekdays"):
+            parts.append(format_weekdays(stats.weekday_histogram()))
+        if kind in ("", "length"):
+            parts.append(format_length(*stats.average_length_minutes()))
+        return "\n".join(parts)
@@ -1,5 +1,7 @@
+import os
 import sqlite3
 from typing import List, Dict, Optional
+from urllib.request import pathname2url
 
 CREATE_TABLE_SQL = """
 CREATE TABLE IF NOT EXISTS events (
@@ -7,44 +9,576 @@ CREATE TABLE IF NOT EXISTS events (
     title TEXT NOT NULL,
     start TEXT NOT NULL,
     end TEXT,
-    description TEXT
+    description TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    edited_at TEXT,
+    uid TEXT
 );
 """
 
+CREATE_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_events_start ON events (start);"
 
-def init_db(db_path: str) -> sqlite3.Connection:
-    """Initialize the SQLite database and return a connection."""
-    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES)
+# --- change tracking -------------------------------------------------------
+# created_at/updated_at are stamped on every write (millisecond UTC) and
+# deletes leave a tombstone, so a mirror can ask for "everything since
+# watermark X" instead of re-reading the table. updated_at is always this
+# file's own stamp, also for rows merged in from elsewhere, so watermarks
+# handed out earlier never skip them; edited_at is when the content was last
+# edited anywhere and decides which copy wins a merge. ids are only unique
+# within one file (two copies can each add an event #7), so merges match
+# events by uid, a random key given to each event where it is created.
+NOW_SQL = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+NEW_UID_SQL = "lower(hex(randomblob(16)))"
+
+
+def _next_stamp_sql(table: str, column: str) -> str:
+    """A timestamp strictly after every existing one in table.column.
+
+    Two changes in the same millisecond would otherwise tie, and a reader
+    whose watermark sits between them would never see the second one.
+    """
+    # One scalar subquery, so the latest stamp is looked up once per use
+    return (f"(SELECT CASE WHEN now > COALESCE(latest, '') THEN now "
+            f"ELSE strftime('%Y-%m-%dT%H:%M:%fZ', julianday(latest) + 0.001 / 86400.0) END "
+            f"FROM (SELECT {NOW_SQL} AS now, MAX({column}) AS latest FROM {table}))")
+
+
+EVENT_STAMP_SQL = _next_stamp_sql("events", "updated_at")
+TOMBSTONE_STAMP_SQL = _next_stamp_sql("deleted_events", "deleted_at")
+
+CREATE_TOMBSTONES_SQL = """
+CREATE TABLE IF NOT EXISTS deleted_events (
+    id INTEGER PRIMARY KEY,
+    deleted_at TEXT NOT NULL,
+    uid TEXT
+);
+"""
+
+SYNC_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_events_updated ON events (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_deleted_events_at ON deleted_events (deleted_at, id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_events_uid ON events (uid);
+"""
+
+SYNC_TRIGGERS_SQL = f"""
+-- add_event stamps its INSERT directly; this covers every other insert
+CREATE TRIGGER IF NOT EXISTS events_stamp_insert AFTER INSERT ON events
+WHEN NEW.updated_at IS NULL
+BEGIN
+    UPDATE events SET created_at = COALESCE(NEW.created_at, {NOW_SQL}), updated_at = {EVENT_STAMP_SQL},
+                      edited_at = COALESCE(NEW.edited_at, {EVENT_STAMP_SQL}), uid = COALESCE(NEW.uid, {NEW_UID_SQL})
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_clear_tombstone AFTER INSERT ON events
+BEGIN
+    DELETE FROM deleted_events WHERE id = NEW.id;
+END;
+
+-- Merges carry the remote edited_at; local edits get the new stamp for both
+CREATE TRIGGER IF NOT EXISTS events_stamp_update AFTER UPDATE OF title, start, end, description ON events
+WHEN NEW.updated_at IS OLD.updated_at
+BEGIN
+    UPDATE events SET updated_at = {EVENT_STAMP_SQL},
+                      edited_at = CASE WHEN NEW.edited_at IS OLD.edited_at THEN {EVENT_STAMP_SQL} ELSE NEW.edited_at END
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_tombstone AFTER DELETE ON events
+BEGIN
+    INSERT OR REPLACE INTO deleted_events (id, deleted_at, uid) VALUES (OLD.id, {TOMBSTONE_STAMP_SQL}, OLD.uid);
+END;
+"""
+
+# Per-day event counts kept up to date by triggers, so views that only need
+# "how busy is each day" never have to read the events themselves.
+CREATE_DAY_COUNTS_SQL = """
+CREATE TABLE IF NOT EXISTS day_counts (
+    day TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+BACKFILL_DAY_COUNTS_SQL = """
+INSERT INTO day_counts (day, count)
+SELECT substr(start, 1, 10), COUNT(*) FROM events GROUP BY substr(start, 1, 10);
+"""
+
+# Years whose events were moved out to their own database file (see archive_path)
+CREATE_ARCHIVES_SQL = """
+CREATE TABLE IF NOT EXISTS archives (
+    year INTEGER PRIMARY KEY,
+    path TEXT NOT NULL
+);
+"""
+
+DAY_COUNTS_TRIGGERS_SQL = """
+CREATE TRIGGER IF NOT EXISTS events_day_count_insert AFTER INSERT ON events
+BEGIN
+    INSERT INTO day_counts (day, count) VALUES (substr(NEW.start, 1, 10), 1)
+    ON CONFLICT (day) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_day_count_delete AFTER DELETE ON events
+BEGIN
+    UPDATE day_counts SET count = count - 1 WHERE day = substr(OLD.start, 1, 10);
+    DELETE FROM day_counts WHERE day = substr(OLD.start, 1, 10) AND count <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_day_count_update AFTER UPDATE OF start ON events
+WHEN substr(OLD.start, 1, 10) <> substr(NEW.start, 1, 10)
+BEGIN
+    UPDATE day_counts SET count = count - 1 WHERE day = substr(OLD.start, 1, 10);
+    DELETE FROM day_counts WHERE day = substr(OLD.start, 1, 10) AND count <= 0;
+    INSERT INTO day_counts (day, count) VALUES (substr(NEW.start, 1, 10), 1)
+    ON CONFLICT (day) DO UPDATE SET count = count + 1;
+END;
+"""
+
+
+def init_db(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Initialize the SQLite database and return a connection.
+
+    Pass check_same_thread=False only if the caller serializes access to the
+    connection itself (e.g. CalendarRouter's per-shard locks).
+    """
+    conn = sqlite3.connect(db_path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=check_same_thread)
     conn.execute(CREATE_TABLE_SQL)
+    conn.execute(CREATE_INDEX_SQL)
+    has_day_counts = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'day_counts'"
+    ).fetchone()
+    if not has_day_counts:
+        # Databases created before day_counts existed need a one-off backfill
+        conn.execute(CREATE_DAY_COUNTS_SQL)
+        conn.execute(BACKFILL_DAY_COUNTS_SQL)
+    conn.executescript(DAY_COUNTS_TRIGGERS_SQL)
+    conn.execute(CREATE_ARCHIVES_SQL)
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(events)")}
+    if "updated_at" not in columns:
+        # Databases created before change tracking: add and backfill the columns
+        conn.execute("ALTER TABLE events ADD COLUMN created_at TEXT")
+        conn.execute("ALTER TABLE events ADD COLUMN updated_at TEXT")
+        conn.execute(f"UPDATE events SET created_at = {NOW_SQL}, updated_at = {NOW_SQL}")
+    if "edited_at" not in columns:
+        # ...and before edited_at, whose stamping triggers replace the old ones
+        conn.execute("ALTER TABLE events ADD COLUMN edited_at TEXT")
+        conn.execute("UPDATE events SET edited_at = updated_at")
+        conn.execute("DROP TRIGGER IF EXISTS events_stamp_insert")
+        conn.execute("DROP TRIGGER IF EXISTS events_stamp_update")
+    if "uid" not in columns:
+        # ...and before uid. Copies of one calendar agree on id and created_at
+        # for the events they share, so existing rows get matching keys.
+        conn.execute("ALTER TABLE events ADD COLUMN uid TEXT")
+        conn.execute("UPDATE events SET uid = id || '@' || COALESCE(created_at, '')")
+        conn.execute("DROP TRIGGER IF EXISTS events_stamp_insert")
+        conn.execute("DROP TRIGGER IF EXISTS events_tombstone")
+    conn.execute(CREATE_TOMBSTONES_SQL)
+    if "uid" not in {r[1] for r in conn.execute("PRAGMA table_info(deleted_events)")}:
+        conn.execute("ALTER TABLE deleted_events ADD COLUMN uid TEXT")
+    conn.executescript(SYNC_INDEXES_SQL)
+    conn.executescript(SYNC_TRIGGERS_SQL)
     conn.commit()
     return conn
 
 
-def add_event(conn: sqlite3.Connection, title: str, start: str, end: Optional[str] = None, description: Optional[str] = None) -> int:
+def connect_read_only(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Open an existing database read-only, skipping init_db's schema setup."""
+    uri = "file:" + pathname2url(os.path.abspath(db_path)) + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=check_same_thread)
+
+
+def add_event(conn: sqlite3.Connection, title: str, start: str, end: Optional[str] = None, description: Optional[str] = None,
+              commit: bool = True) -> int:
     cur = conn.cursor()
+    # Stamped here rather than by the insert trigger, which would cost a
+    # second UPDATE per row
     cur.execute(
-        "INSERT INTO events (title, start, end, description) VALUES (?, ?, ?, ?)",
+        "INSERT INTO events (title, start, end, description, created_at, updated_at, edited_at, uid) "
+        f"SELECT ?, ?, ?, ?, {NOW_SQL}, stamp, stamp, {NEW_UID_SQL} FROM (SELECT {EVENT_STAMP_SQL} AS stamp)",
         (title, start, end, description),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
     return cur.lastrowid
 
 
-def list_events(conn: sqlite3.Connection, date: Optional[str] = None) -> List[Dict]:
+def put_event(conn: sqlite3.Connection, event: Dict, commit: bool = True) -> None:
+    """Insert or overwrite an event row, keeping its id (used to mirror writes).
+
+    An upsert rather than INSERT OR REPLACE: REPLACE deletes the old row
+    without firing the delete triggers, which would leave day_counts
+    counting the event twice.
+    """
+    conn.execute(
+        "INSERT INTO events (id, title, start, end, description) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (id) DO UPDATE SET title = excluded.title, start = excluded.start, "
+        "end = excluded.end, description = excluded.description",
+        (event["id"], event["title"], event["start"], event.get("end"), event.get("description")),
+    )
+    if commit:
+        conn.commit()
+
+
+def fingerprint(conn: sqlite3.Connection) -> tuple:
+    """Cheap summary of the events and day_counts tables for comparing two copies.
+
+    Edits keep ids and often lengths unchanged, so this only catches drift
+    in what was mirrored; use data_version to notice other writers.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT COUNT(*), COALESCE(SUM(id), 0), COALESCE(MAX(id), 0), "
+        "COALESCE(SUM(length(title) + length(start) + COALESCE(length(end), 0) + COALESCE(length(description), 0)), 0), "
+        "(SELECT COALESCE(SUM(count), 0) FROM day_counts) "
+        "FROM events"
+    )
+    return cur.fetchone()
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    """SQLite's counter that changes whenever another connection commits to the file."""
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def list_events(conn: sqlite3.Connection, date: Optional[str] = None, schema: str = "main") -> List[Dict]:
     cur = conn.cursor()
     if date:
         # Find events where start begins with date (assumes ISO date prefix)
-        cur.execute("SELECT id, title, start, end, description FROM events WHERE start LIKE ? ORDER BY start", (f"{date}%",))
+        cur.execute(f"SELECT id, title, start, end, description FROM {schema}.events WHERE start LIKE ? ORDER BY start",
+                    (f"{date}%",))
     else:
-        cur.execute("SELECT id, title, start, end, description FROM events ORDER BY start")
+        cur.execute(f"SELECT id, title, start, end, description FROM {schema}.events ORDER BY start")
     rows = cur.fetchall()
     return [
         {"id": r[0], "title": r[1], "start": r[2], "end": r[3], "description": r[4]} for r in rows
     ]
 
 
-def remove_event(conn: sqlite3.Connection, event_id: int) -> bool:
+def list_events_between(conn: sqlite3.Connection, start: str, end: Optional[str] = None,
+                        limit: Optional[int] = None, schema: str = "main") -> List[Dict]:
+    """Return events whose start falls in [start, end), using the start index."""
     cur = conn.cursor()
-    cur.execute("DELETE FROM events WHERE id = ?", (event_id,))
-    conn.commit()
+    sql = f"SELECT id, title, start, end, description FROM {schema}.events WHERE start >= ?"
+    params: list = [start]
+    if end:
+        sql += " AND start < ?"
+        params.append(end)
+    sql += " ORDER BY start"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    return [
+        {"id": r[0], "title": r[1], "start": r[2], "end": r[3], "description": r[4]} for r in rows
+    ]
+
+
+def search_events(conn: sqlite3.Connection, terms: List[str], since: Optional[str] = None,
+                  limit: Optional[int] = None, schema: str = "main") -> List[Dict]:
+    """Return events whose title contains any of terms (case-insensitive)."""
+    if not terms:
+        return []
+    cur = conn.cursor()
+    sql = f"SELECT id, title, start, end, description FROM {schema}.events WHERE ("
+    sql += " OR ".join("title LIKE ?" for _ in terms) + ")"
+    params: list = [f"%{t}%" for t in terms]
+    if since:
+        sql += " AND start >= ?"
+        params.append(since)
+    sql += " ORDER BY start"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+    return [
+        {"id": r[0], "title": r[1], "start": r[2], "end": r[3], "description": r[4]} for r in rows
+    ]
+
+
+def _start_range(start: Optional[str], end: Optional[str]) -> tuple:
+    """WHERE clause (and parameters) for events starting in [start, end)."""
+    sql, params = " WHERE 1", []
+    if start:
+        sql += " AND start >= ?"
+        params.append(start)
+    if end:
+        sql += " AND start < ?"
+        params.append(end)
+    return sql, params
+
+
+def hour_counts(conn: sqlite3.Connection, start: Optional[str] = None, end: Optional[str] = None,
+                schema: str = "main") -> List[int]:
+    """Number of events starting in each hour of the day, for starts in [start, end)."""
+    where, params = _start_range(start, end)
+    cur = conn.cursor()
+    cur.execute(f"SELECT CAST(substr(start, 12, 2) AS INTEGER), COUNT(*) FROM {schema}.events{where} GROUP BY 1",
+                params)
+    counts = [0] * 24
+    for hour, n in cur.fetchall():
+        if hour is not None and 0 <= hour < 24:
+            counts[hour] += n
+    return counts
+
+
+def length_totals(conn: sqlite3.Connection, start: Optional[str] = None, end: Optional[str] = None,
+                  schema: str = "main") -> tuple:
+    """(total minutes, count) over events in [start, end) that have an end time."""
+    where, params = _start_range(start, end)
+    cur = conn.cursor()
+    cur.execute(
+        f"SELECT COALESCE(SUM((julianday(end) - julianday(start)) * 1440.0), 0), COUNT(end) "
+        f"FROM {schema}.events{where} AND end IS NOT NULL",
+        params,
+    )
+    total, n = cur.fetchone()
+    return total, n
+
+
+def day_counts(conn: sqlite3.Connection, start_day: str, end_day: str, schema: str = "main") -> Dict[str, int]:
+    """Return {YYYY-MM-DD: event count} for days in [start_day, end_day)."""
+    cur = conn.cursor()
+    cur.execute(f"SELECT day, count FROM {schema}.day_counts WHERE day >= ? AND day < ?", (start_day, end_day))
+    return dict(cur.fetchall())
+
+
+# Columns that update_events may change
+EDITABLE_COLUMNS = ("title", "start", "end", "description")
+
+
+def get_events(conn: sqlite3.Connection, event_ids: List[int], schema: str = "main") -> Dict[int, Dict]:
+    """Return {id: event} for the given ids that exist in schema.events."""
+    found: Dict[int, Dict] = {}
+    cur = conn.cursor()
+    ids = list(event_ids)
+    # Stay under SQLite's bound-parameter limit for long id lists
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        cur.execute(
+            f"SELECT id, title, start, end, description FROM {schema}.events "
+            f"WHERE id IN ({', '.join('?' for _ in chunk)})",
+            chunk,
+        )
+        for r in cur.fetchall():
+            found[r[0]] = {"id": r[0], "title": r[1], "start": r[2], "end": r[3], "description": r[4]}
+    return found
+
+
+def update_events(conn: sqlite3.Connection, updates: List[tuple], commit: bool = True, schema: str = "main") -> int:
+    """Apply (id, {column: value}) edits; returns the number of rows changed.
+
+    Each UPDATE sets only the columns given for that event. Edits that touch
+    the same columns share one prepared statement via executemany, so
+    rescheduling a long series costs one statement and one commit.
+    """
+    groups: Dict[tuple, List[tuple]] = {}
+    for event_id, fields in updates:
+        unknown = set(fields) - set(EDITABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"cannot update column(s): {', '.join(sorted(unknown))}")
+        if not fields:
+            continue
+        columns = tuple(c for c in EDITABLE_COLUMNS if c in fields)
+        groups.setdefault(columns, []).append(tuple(fields[c] for c in columns) + (event_id,))
+    cur = conn.cursor()
+    changed = 0
+    for columns, rows in groups.items():
+        assignments = ", ".join(f"{c} = ?" for c in columns)
+        cur.executemany(f"UPDATE {schema}.events SET {assignments} WHERE id = ?", rows)
+        changed += cur.rowcount
+    if commit:
+        conn.commit()
+    return changed
+
+
+def remove_event(conn: sqlite3.Connection, event_id: int, commit: bool = True, schema: str = "main") -> bool:
+    cur = conn.cursor()
+    cur.execute(f"DELETE FROM {schema}.events WHERE id = ?", (event_id,))
+    if commit:
+        conn.commit()
     return cur.rowcount > 0
+
+
+def archive_path(db_path: str, year: int) -> str:
+    """File holding the archived events of year, e.g. calendar.2023.db."""
+    return f"{os.path.splitext(db_path)[0]}.{year}.db"
+
+
+def list_archives(conn: sqlite3.Connection, first_year: Optional[int] = None,
+                  last_year: Optional[int] = None) -> Dict[int, str]:
+    """Return {year: file name} of archived years within [first_year, last_year]."""
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT year, path FROM archives WHERE year >= ? AND year <= ? ORDER BY year",
+        (first_year if first_year is not None else -1, last_year if last_year is not None else 1 << 31),
+    )
+    return dict(cur.fetchall())
+
+
+def years_before(conn: sqlite3.Connection, cutoff: str) -> List[int]:
+    """Distinct years that have events starting before cutoff."""
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT substr(start, 1, 4) FROM events WHERE start < ? ORDER BY 1", (cutoff,))
+    return [int(r[0]) for r in cur.fetchall()]
+
+
+def attach_database(conn: sqlite3.Connection, path: str, alias: str) -> None:
+    conn.execute("ATTACH DATABASE ? AS " + alias, (path,))
+
+
+def detach_database(conn: sqlite3.Connection, alias: str) -> None:
+    conn.execute("DETACH DATABASE " + alias)
+
+
+def move_events(conn: sqlite3.Connection, schema: str, start: str, end: str) -> int:
+    """Move events starting in [start, end) into schema.events, keeping their ids.
+
+    Nothing is committed, so the copy and the delete land together.
+    """
+    cur = conn.cursor()
+    cur.execute(
+        f"INSERT INTO {schema}.events (id, title, start, end, description, created_at, updated_at, edited_at, uid) "
+        "SELECT id, title, start, end, description, created_at, updated_at, edited_at, uid FROM main.events "
+        "WHERE start >= ? AND start < ?",
+        (start, end),
+    )
+    cur.execute("DELETE FROM main.events WHERE start >= ? AND start < ?", (start, end))
+    moved = cur.rowcount
+    # Archived events were not deleted, so they must not show up as deletes
+    cur.execute(
+        f"DELETE FROM main.deleted_events WHERE id IN "
+        f"(SELECT id FROM {schema}.events WHERE start >= ? AND start < ?)",
+        (start, end),
+    )
+    return moved
+
+
+def changes_since(conn: sqlite3.Connection, updated_after: tuple, deleted_after: tuple,
+                  limit: Optional[int] = None) -> tuple:
+    """Return (rows, tombstones) changed after the (timestamp, id) watermarks.
+
+    Both lists are ordered by (timestamp, id) and backed by an index, so the
+    cost is proportional to the number of changes, not the table size.
+    """
+    cur = conn.cursor()
+    lim = limit if limit is not None else -1
+    cur.execute(
+        "SELECT id, title, start, end, description, created_at, updated_at, edited_at, uid FROM events "
+        "WHERE (updated_at, id) > (?, ?) ORDER BY updated_at, id LIMIT ?",
+        (*updated_after, lim),
+    )
+    rows = [
+        {"id": r[0], "title": r[1], "start": r[2], "end": r[3], "description": r[4],
+         "created_at": r[5], "updated_at": r[6], "edited_at": r[7], "uid": r[8]} for r in cur.fetchall()
+    ]
+    cur.execute(
+        "SELECT id, deleted_at, uid FROM deleted_events WHERE (deleted_at, id) > (?, ?) "
+        "ORDER BY deleted_at, id LIMIT ?",
+        (*deleted_after, lim),
+    )
+    tombstones = [{"id": r[0], "deleted_at": r[1], "uid": r[2]} for r in cur.fetchall()]
+    return rows, tombstones
+
+
+def find_uids(conn: sqlite3.Connection, uids: List[str], schema: str = "main") -> Dict[str, Dict]:
+    """Return {uid: {"id", "edited_at"}} for the given uids that exist in schema.events."""
+    found: Dict[str, Dict] = {}
+    cur = conn.cursor()
+    uids = list(uids)
+    for i in range(0, len(uids), 500):
+        chunk = uids[i:i + 500]
+        cur.execute(
+            f"SELECT uid, id, edited_at FROM {schema}.events WHERE uid IN ({', '.join('?' for _ in chunk)})",
+            chunk,
+        )
+        for r in cur.fetchall():
+            found[r[0]] = {"id": r[1], "edited_at": r[2]}
+    return found
+
+
+def upsert_event(conn: sqlite3.Connection, event: Dict) -> Optional[tuple]:
+    """Apply a replicated row if it was edited later than ours (last writer wins).
+
+    The row is matched by uid. One we don't have yet keeps its remote id
+    unless this file has already used that id, in which case it gets a new
+    one. It keeps its remote edited_at but gets a fresh local updated_at, so
+    mirrors of this file pick it up too. Returns ("add" | "update", local
+    id) if the row was written, None if ours is newer.
+    """
+    edited_at = event.get("edited_at") or event["updated_at"]
+    cur = conn.cursor()
+    row = cur.execute("SELECT id FROM events WHERE uid = ?", (event["uid"],)).fetchone()
+    if row:
+        cur.execute(
+            "UPDATE events SET title = ?, start = ?, end = ?, description = ?, created_at = ?, edited_at = ? "
+            "WHERE id = ? AND (edited_at < ? OR edited_at IS NULL)",
+            (event["title"], event["start"], event.get("end"), event.get("description"),
+             event.get("created_at"), edited_at, row[0], edited_at),
+        )
+        return ("update", row[0]) if cur.rowcount > 0 else None
+    # Every id up to the AUTOINCREMENT high-water mark is (or was) one of ours
+    used = cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+    event_id = event["id"] if event["id"] > (used[0] if used else 0) else None
+    cur.execute(
+        "INSERT INTO events (id, title, start, end, description, created_at, edited_at, uid) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (event_id, event["title"], event["start"], event.get("end"), event.get("description"),
+         event.get("created_at"), edited_at, event["uid"]),
+    )
+    return "add", cur.lastrowid
+
+
+def apply_tombstone(conn: sqlite3.Connection, tombstone: Dict) -> Optional[int]:
+    """Delete a replicated delete unless our copy was edited after it.
+
+    Matched by uid (by id for tombstones written before uids existed).
+    Returns the local id of the deleted event, or None.
+    """
+    cur = conn.cursor()
+    key = "uid" if tombstone.get("uid") else "id"
+    row = cur.execute(
+        f"SELECT id FROM events WHERE {key} = ? AND (edited_at IS NULL OR edited_at <= ?)",
+        (tombstone[key], tombstone["deleted_at"]),
+    ).fetchone()
+    if not row:
+        return None
+    cur.execute("DELETE FROM events WHERE id = ?", (row[0],))
+    return row[0]
+
+
+def record_tombstone(conn: sqlite3.Connection, event_id: int, schema: str) -> None:
+    """Copy the tombstone of an event deleted from archive schema into the main file."""
+    conn.execute(
+        f"INSERT OR REPLACE INTO main.deleted_events (id, deleted_at, uid) "
+        f"SELECT id, {TOMBSTONE_STAMP_SQL}, uid FROM {schema}.deleted_events WHERE id = ?",
+        (event_id,),
+    )
+
+
+def unarchive_events(conn: sqlite3.Connection, schema: str, event_ids: List[int]) -> None:
+    """Move events back from schema.events into the main file, keeping ids.
+
+    They get a fresh updated_at there, so the change feed reports them.
+    Nothing is committed.
+    """
+    marks = ", ".join("?" for _ in event_ids)
+    conn.execute(
+        "INSERT INTO main.events (id, title, start, end, description, created_at, edited_at, uid) "
+        f"SELECT id, title, start, end, description, created_at, edited_at, uid FROM {schema}.events "
+        f"WHERE id IN ({marks})",
+        event_ids,
+    )
+    conn.execute(f"DELETE FROM {schema}.events WHERE id IN ({marks})", event_ids)
+
+
+def register_archive(conn: sqlite3.Connection, year: int, path: str) -> None:
+    conn.execute("INSERT OR REPLACE INTO archives (year, path) VALUES (?, ?)", (year, path))
+
+
+def vacuum(conn: sqlite3.Connection) -> None:
+    """Rebuild the main database file so space freed by archiving is returned."""
+    conn.execute("VACUUM")
@@ -2,14 +2,32 @@ import tkinter as tk
 from tkinter import scrolledtext, font
 from typing import Optional
 import calendar as pycalendar
+import itertools
+import threading
+from collections import OrderedDict
 from datetime import date
 
+from .reminders import ReminderScheduler
+from .prefetch import PeriodPrefetcher, neighbours
+from .transcript import TranscriptLog, collapse, format_matches
+from .stats import ScheduleStats
+
 
 class ChatGUI:
     """Simple Tkinter GUI wrapper for a chatbot object with .respond(text)->str method."""
 
-    def __init__(self, bot, title: Optional[str] = "Calendar Chatbot"):
+    def __init__(self, bot, title: Optional[str] = "Calendar Chatbot", reminders: bool = True,
+                 reminder_lead_minutes: int = 10, max_transcript_lines: int = 2000,
+                 max_message_lines: int = 30, history_path: Optional[str] = None,
+                 replica_check_ms: int = 60000):
         self.bot = bot
+        # The on-screen transcript keeps only the newest lines; long replies
+        # are collapsed and everything is written to the history log.
+        self.max_transcript_lines = max_transcript_lines
+        self.max_message_lines = max_message_lines
+        self.history = TranscriptLog(history_path) if history_path else None
+        self._collapsed = OrderedDict()  # tag -> full text of a collapsed message
+        self._collapsed_ids = itertools.count()
         self.root = tk.Tk()
         self.root.title(title)
         
@@ -25,6 +43,23 @@ class ChatGUI:
         self.root.configure(bg=self.bg_color)
         self._build_ui()
 
+        # Periodically make sure an in-memory replica still matches disk
+        self.replica_check_ms = replica_check_ms
+        if getattr(self.bot.calendar, "replica", None) is not None:
+            self.root.after(self.replica_check_ms, self._check_replica)
+
+        # Load the LLM in the background while the window comes up
+        if hasattr(self.bot, "warm_up"):
+            self.bot.warm_up()
+
+        # Reminders fire on a worker thread and are handed to the Tk loop
+        self.reminders = None
+        if reminders:
+            self.reminders = ReminderScheduler(
+                self.bot.calendar, self._on_reminder, lead_minutes=reminder_lead_minutes
+            )
+            self.reminders.start()
+
     def _build_ui(self):
         # Main container frame with two columns (chat + calendar)
         main_frame = tk.Frame(self.root, bg=self.bg_color)
@@ -75,6 +110,7 @@ class ChatGUI:
                               rmargin=10, spacing1=5, spacing3=5)
         self.txt.tag_configure("bot_msg", background=self.bot_bg, lmargin1=10, lmargin2=10, 
                               rmargin=10, spacing1=5, spacing3=5)
+        self.txt.tag_configure("more", foreground="#2C5F8D", underline=True)
 
         # Calendar view embedded on the right side
         self.calendar_frame = tk.Frame(main_frame, bg=self.bg_color)
@@ -123,23 +159,61 @@ class ChatGUI:
 
         self.entry.focus()
 
-    def _append(self, who: str, text: str, is_bot: bool = False):
+    def _append(self, who: str, text: str, is_bot: bool = False, log: bool = True):
+        if self.history and log:
+            self.history.append(who, text)
         self.txt.configure(state=tk.NORMAL)
         
         # Add sender label with styling
         tag = "bot" if is_bot else "user"
         msg_tag = "bot_msg" if is_bot else "user_msg"
         
+        shown, hidden = collapse(text, self.max_message_lines)
         self.txt.insert(tk.END, f"{who}: ", tag)
-        self.txt.insert(tk.END, f"{text}\n\n", msg_tag)
+        if hidden:
+            self.txt.insert(tk.END, f"{shown}\n", msg_tag)
+            link = f"more{next(self._collapsed_ids)}"
+            self._collapsed[link] = text
+            self.txt.insert(tk.END, f"[show {hidden} more lines]", (msg_tag, "more", link))
+            self.txt.tag_bind(link, "<Button-1>", lambda e, t=link: self._show_full(t))
+            self.txt.insert(tk.END, "\n\n", msg_tag)
+        else:
+            self.txt.insert(tk.END, f"{text}\n\n", msg_tag)
+        self._trim_transcript()
         self.txt.see(tk.END)
         self.txt.configure(state=tk.DISABLED)
 
-    def _append_user(self, text: str):
-        self._append("You", text, is_bot=False)
+    def _trim_transcript(self):
+        """Drop the oldest lines once the transcript is over its cap."""
+        lines = int(self.txt.index("end-1c").split(".")[0])
+        excess = lines - self.max_transcript_lines
+        if excess > 0:
+            self.txt.delete("1.0", f"{excess + 1}.0")
+        # Forget collapsed messages whose link has scrolled out of the widget
+        for link in list(self._collapsed):
+            if self.txt.tag_ranges(link):
+                break
+            del self._collapsed[link]
+            self.txt.tag_delete(link)
+
+    def _show_full(self, link: str):
+        """Open a collapsed message in its own window."""
+        text = self._collapsed.get(link)
+        if text is None:
+            return
+        win = tk.Toplevel(self.root)
+        win.title("Full message")
+        view = scrolledtext.ScrolledText(win, wrap=tk.WORD, width=80, height=30,
+                                         bg=self.bg_color, fg=self.text_color, font=("Segoe UI", 10))
+        view.pack(fill=tk.BOTH, expand=True)
+        view.insert(tk.END, text)
+        view.configure(state=tk.DISABLED)
+
+    def _append_user(self, text: str, log: bool = True):
+        self._append("You", text, is_bot=False, log=log)
 
-    def _append_bot(self, text: str):
-        self._append("Bot", text, is_bot=True)
+    def _append_bot(self, text: str, log: bool = True):
+        self._append("Bot", text, is_bot=True, log=log)
 
     def _on_enter(self, event=None):
         self._on_send()
@@ -149,16 +223,61 @@ class ChatGUI:
         text = self.entry_var.get().strip()
         if not text:
             return
+        self.entry_var.set("")
+        if text.lower().startswith("/history"):
+            # Searches and their results stay out of the log; otherwise every
+            # later search would also match the earlier ones
+            self._append_user(text, log=False)
+            self._append_bot(self._search_history(text[len("/history"):].strip()), log=False)
+            return
         self._append_user(text)
         try:
-            resp = self.bot.respond(text)
+            # Commands run here (they use the calendar's connection); only
+            # the LLM wait moves to a worker, so the window stays responsive
+            # and a newer message cancels a reply that is still streaming
+            finish = self.bot.begin(text)
+        except Exception as e:
+            self._append_bot(f"Error: {e}")
+            return
+        threading.Thread(target=self._finish_reply, args=(finish,), name="chat-reply", daemon=True).start()
+
+    def _finish_reply(self, finish):
+        # Worker thread: only touch Tk via root.after
+        try:
+            resp, _ = finish()
         except Exception as e:
             resp = f"Error: {e}"
-        self._append_bot(resp)
-        self.entry_var.set("")
+        self.root.after(0, self._append_bot, resp)
+
+    def _search_history(self, query: str) -> str:
+        if not self.history:
+            return "Chat history is not being saved."
+        if not query:
+            return "Usage: /history <text>"
+        return format_matches(self.history.search(query))
+
+    def _check_replica(self):
+        try:
+            if not self.bot.calendar.check_replica():
+                # Disk changed underneath us; cached periods are out of date
+                self.calendar_view.prefetcher.invalidate()
+                self.calendar_view._hour_heat = None
+                self.calendar_view._refresh_view()
+        except Exception:
+            pass
+        self.root.after(self.replica_check_ms, self._check_replica)
+
+    def _on_reminder(self, event):
+        # Called from the reminder thread; only touch Tk via root.after
+        self.root.after(0, self._append_bot, f"⏰ Reminder: {event['title']} at {event['start']}")
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self.reminders:
+                self.reminders.stop()
+            self.calendar_view.prefetcher.close()
     
     def _toggle_calendar(self):
         """Toggle calendar visibility"""
@@ -182,7 +301,8 @@ class CalendarView:
     """A simple month-grid calendar view that shows events per day.
 
     calendar_obj must implement list_events(date: Optional[str]) -> List[Dict]
-    where date is an ISO YYYY-MM-DD prefix.
+    where date is an ISO YYYY-MM-DD prefix, and day_counts(year) -> Dict[str, int]
+    for the year view.
     """
     _instance = None 
 
@@ -212,6 +332,17 @@ class CalendarView:
         self.event_bg = "#F4D03F"
         self.text_color = "#2C3E50"
         self.accent_color = "#E8B923"
+        # Year-view heatmap shades, from one event a day up to very busy
+        self.heat_colors = ["#FFF2CC", "#FFE5A3", "#F4D03F", "#E8B923", "#D4A017"]
+
+        # Period data is served from a small cache that a worker thread fills
+        # with the previous/next period after every render
+        self.prefetcher = PeriodPrefetcher(calendar_obj)
+        # Optional busy-hours overlay for the day view, computed over the year
+        # up to the viewed month (see _hour_heat_colors)
+        self.show_heat = False
+        self._hour_heat = None
+        calendar_obj.add_listener(self._on_calendar_change)
 
         self.frame = tk.Frame(parent, bg=self.bg_color)
         self._build_ui()
@@ -278,6 +409,14 @@ class CalendarView:
         )
         self.year_view_btn.pack(side=tk.LEFT, padx=2)
 
+        self.heat_btn = tk.Button(
+            view_frame, text="🔥 Busy hours", command=self._toggle_heat,
+            font=view_btn_font, bg=self.cell_bg, fg=self.text_color,
+            relief=tk.FLAT, bd=0, padx=12, pady=6,
+            cursor="hand2", activebackground=self.event_bg
+        )
+        self.heat_btn.pack(side=tk.LEFT, padx=(10, 2))
+
         # Body container
         body = tk.Frame(self.frame, bg=self.bg_color)
         body.pack(fill=tk.BOTH, expand=True, padx=0, pady=0)
@@ -329,6 +468,7 @@ class CalendarView:
         is_current_month = (today.year == self.year and today.month == self.month)
         
         month_matrix = pycalendar.monthcalendar(self.year, self.month)
+        month_events = self._period(("month", self.year, self.month))
         day_font = font.Font(family="Segoe UI", size=11, weight="bold")
         event_font = font.Font(family="Segoe UI", size=9)
         
@@ -361,10 +501,7 @@ class CalendarView:
 
                     # Check events for this day
                     iso = f"{self.year}-{self.month:02d}-{day:02d}"
-                    try:
-                        events = self.calendar.list_events(iso)
-                    except Exception:
-                        events = []
+                    events = month_events.get(iso, [])
 
                     if events:
                         # Event indicator button
@@ -393,10 +530,7 @@ class CalendarView:
 
     def _show_day(self, day: int):
         iso = f"{self.year}-{self.month:02d}-{day:02d}"
-        try:
-            events = self.calendar.list_events(iso)
-        except Exception as e:
-            events = []
+        events = self._period(("month", self.year, self.month)).get(iso, [])
 
         self.side.configure(state=tk.NORMAL)
         self.side.delete("1.0", tk.END)
@@ -443,10 +577,7 @@ class CalendarView:
         
         # Get events for this day
         iso = f"{self.year}-{self.month:02d}-{self.day:02d}"
-        try:
-            events = self.calendar.list_events(iso)
-        except Exception:
-            events = []
+        events = self._period(("month", self.year, self.month)).get(iso, [])
         
         # Create a scrollable canvas for the day view
         canvas = tk.Canvas(self.grid_frame, bg=self.bg_color, highlightthickness=0)
@@ -465,6 +596,8 @@ class CalendarView:
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
         
+        heat = self._hour_heat_colors() if self.show_heat else {}
+
         # Create hourly time slots (6 AM to 11 PM)
         hour_font = font.Font(family="Segoe UI", size=10, weight="bold")
         event_font = font.Font(family="Segoe UI", size=9)
@@ -482,7 +615,7 @@ class CalendarView:
             
             time_label = tk.Label(
                 hour_frame, text=display_time,
-                font=hour_font, bg=self.cell_bg, fg=self.text_color,
+                font=hour_font, bg=heat.get(hour, self.cell_bg), fg=self.text_color,
                 width=12, anchor="w", padx=10, pady=8
             )
             time_label.pack(side=tk.LEFT, fill=tk.Y)
@@ -524,6 +657,9 @@ class CalendarView:
         # Update title
         self.title_lbl.config(text=str(self.year))
         
+        # One indexed read of the trigger-maintained per-day counts
+        counts = self._period(("year", self.year))
+
         # Create 12-month grid (3 rows x 4 columns)
         mini_month_font = font.Font(family="Segoe UI", size=9, weight="bold")
         day_font = font.Font(family="Segoe UI", size=7)
@@ -575,15 +711,11 @@ class CalendarView:
                                    today.month == month_idx and 
                                    today.day == day)
                         
-                        # Check if day has events
+                        # Shade the day by how many events it has
                         iso = f"{self.year}-{month_idx:02d}-{day:02d}"
-                        try:
-                            day_events = self.calendar.list_events(iso)
-                            has_events = len(day_events) > 0
-                        except Exception:
-                            has_events = False
+                        count = counts.get(iso, 0)
                         
-                        bg = "#FFD700" if is_today else (self.event_bg if has_events else self.cell_bg)
+                        bg = "#FFD700" if is_today else self._heat_color(count)
                         fg = self.text_color
                         
                         lbl = tk.Label(
@@ -602,6 +734,49 @@ class CalendarView:
         for i in range(3):
             self.grid_frame.grid_rowconfigure(i, weight=1)
     
+    def _on_calendar_change(self, action, event):
+        self._hour_heat = None
+
+    def _toggle_heat(self):
+        self.show_heat = not self.show_heat
+        self.heat_btn.config(bg=self.event_bg if self.show_heat else self.cell_bg)
+        if self.current_view == "day":
+            self._refresh_view()
+
+    def _hour_heat_colors(self):
+        """{hour: background} shading each hour by how often events start then.
+
+        Covers the year up to the viewed month, so a render never scans the
+        whole history; cached until the calendar changes or the view moves
+        to another month.
+        """
+        key = (self.year, self.month)
+        if self._hour_heat is None or self._hour_heat[0] != key:
+            since = f"{self.year - 1:04d}-{self.month:02d}-01"
+            until = f"{self.year + 1:04d}-01-01" if self.month == 12 else f"{self.year:04d}-{self.month + 1:02d}-01"
+            try:
+                hist = ScheduleStats.load(self.calendar, since, until).hour_histogram()
+            except Exception:
+                hist = [0] * 24
+            peak = max(hist) or 1
+            self._hour_heat = (key, {
+                h: self.heat_colors[min(len(self.heat_colors) - 1, c * len(self.heat_colors) // (peak + 1))]
+                for h, c in enumerate(hist) if c
+            })
+        return self._hour_heat[1]
+
+    def _heat_color(self, count: int) -> str:
+        """Background for a year-view day with count events."""
+        if count <= 0:
+            return self.cell_bg
+        if count <= 2:
+            return self.heat_colors[count - 1]
+        if count <= 4:
+            return self.heat_colors[2]
+        if count <= 7:
+            return self.heat_colors[3]
+        return self.heat_colors[4]
+
     def _goto_month(self, month, day):
         """Navigate to a specific month and day"""
         self.month = month
@@ -637,6 +812,19 @@ class CalendarView:
             self._draw_month()
         else:  # year
             self._draw_year()
+        self.prefetcher.prefetch(neighbours(self._current_period()))
+
+    def _current_period(self):
+        if self.current_view == "year":
+            return ("year", self.year)
+        return ("month", self.year, self.month)
+
+    def _period(self, key):
+        """Data for a period, served from the prefetch cache when possible."""
+        try:
+            return self.prefetcher.get(key)
+        except Exception:
+            return {}
     
     def _prev_period(self):
         """Navigate to previous period based on current view"""
@@ -0,0 +1,183 @@
+import heapq
+import itertools
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+OLLAMA_URL = "http://localhost:11434/api/generate"
+
+# Lower number runs first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+class LLMCancelled(Exception):
+    """Raised to a caller whose generation was superseded by a newer one."""
+
+
+class _Generation:
+    def __init__(self, key: str, payload: Dict, priority: int):
+        self.key = key
+        self.payload = payload
+        self.priority = priority
+        self.sessions = set()
+        self.waiters = 0
+        self.cancelled = False
+        self.response = None
+        self.result: Optional[Tuple[str, Optional[List[int]]]] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+
+class LLMRequestManager:
+    """Shares one Ollama server between many chat sessions.
+
+    - A new request from a session cancels that session's previous generation
+      by closing its stream (unless another session is still waiting on it).
+    - Identical payloads that are in flight at the same time are coalesced
+      onto a single upstream request.
+    - At most max_concurrent generations run at once; waiting requests are
+      started in priority order, so INTERACTIVE work goes before BACKGROUND.
+    """
+
+    def __init__(self, url: str = OLLAMA_URL, max_concurrent: int = 2, post=requests.post):
+        self.url = url
+        self.max_concurrent = max_concurrent
+        self._post = post
+        self._cond = threading.Condition()
+        self._active = 0
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._inflight: Dict[str, _Generation] = {}
+        self._by_session: Dict[str, _Generation] = {}
+
+    def generate(self, payload: Dict, session: Optional[str] = None,
+                 priority: int = INTERACTIVE) -> Tuple[str, Optional[List[int]]]:
+        """Run payload against /api/generate and return (text, context)."""
+        key = json.dumps(payload, sort_keys=True)
+        with self._cond:
+            old = self._by_session.get(session) if session is not None else None
+            if old is not None and old.key != key:
+                self._detach(old, session)
+            job = self._inflight.get(key)
+            owner = job is None
+            if owner:
+                job = _Generation(key, payload, priority)
+                self._inflight[key] = job
+            job.waiters += 1
+            if session is not None:
+                job.sessions.add(session)
+                self._by_session[session] = job
+
+        if owner:
+            self._run(job)
+        else:
+            job.done.wait()
+
+        with self._cond:
+            superseded = session is not None and session not in job.sessions
+            if session is not None and self._by_session.get(session) is job:
+                del self._by_session[session]
+        if job.cancelled or superseded:
+            raise LLMCancelled()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def cancel(self, session: str) -> None:
+        """Cancel whatever the session currently has in flight."""
+        with self._cond:
+            job = self._by_session.pop(session, None)
+            if job is not None:
+                self._detach(job, session)
+
+    def _detach(self, job: _Generation, session: str) -> None:
+        # Caller holds self._cond
+        job.sessions.discard(session)
+        job.waiters -= 1
+        if job.waiters <= 0 and not job.done.is_set():
+            job.cancelled = True
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            if job.response is not None:
+                job.response.close()
+            self._cond.notify_all()
+
+    def _acquire(self, job: _Generation) -> bool:
+        with self._cond:
+            ticket = (job.priority, next(self._seq))
+            heapq.heappush(self._queue, ticket)
+            while not job.cancelled and (self._active >= self.max_concurrent or self._queue[0] != ticket):
+                self._cond.wait()
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            if job.cancelled:
+                self._cond.notify_all()
+                return False
+            self._active += 1
+            return True
+
+    def _release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _run(self, job: _Generation) -> None:
+        try:
+            if not self._acquire(job):
+                return
+            try:
+                self._stream(job)
+            finally:
+                self._release()
+        except Exception as e:
+            if not job.cancelled:
+                job.error = e
+        finally:
+            with self._cond:
+                if self._inflight.get(job.key) is job:
+                    del self._inflight[job.key]
+                job.response = None
+            job.done.set()
+
+    def _stream(self, job: _Generation) -> None:
+        response = self._post(self.url, headers={"Content-Type": "application/json"},
+                              json=job.payload, stream=True)
+        with self._cond:
+            job.response = response
+            if job.cancelled:
+                response.close()
+                return
+
+        output = ""
+        context = None
+        try:
+            for line in response.iter_lines():
+                if job.cancelled:
+                    break
+                if line:
+                    try:
+                        obj = json.loads(line.decode("utf-8"))
+                    except json.JSONDecodeError:
+                        continue
+                    output += obj.get("response", "")
+                    if obj.get("done"):
+                        context = obj.get("context")
+        finally:
+            response.close()
+        job.result = (output, context)
+
+
+_shared_manager: Optional[LLMRequestManager] = None
+_shared_lock = threading.Lock()
+
+
+def shared_manager() -> LLMRequestManager:
+    """Process-wide manager so every ChatBot shares the same limits."""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = LLMRequestManager()
+        return _shared_manager
@@ -0,0 +1,118 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from .calendar import Calendar
+
+
+def neighbours(key: Tuple) -> List[Tuple]:
+    """The periods either side of key: ("month", y, m) or ("year", y)."""
+    if key[0] == "year":
+        return [("year", key[1] - 1), ("year", key[1] + 1)]
+    _, y, m = key
+    prev_key = ("month", y - 1, 12) if m == 1 else ("month", y, m - 1)
+    next_key = ("month", y + 1, 1) if m == 12 else ("month", y, m + 1)
+    return [prev_key, next_key]
+
+
+def fetch_period(calendar: Calendar, key: Tuple):
+    """Load what a view needs for one period.
+
+    ("month", y, m) -> {YYYY-MM-DD: [events]} from a single range query;
+    ("year", y)     -> {YYYY-MM-DD: count} from the day_counts table.
+    """
+    if key[0] == "year":
+        return calendar.day_counts(key[1])
+    _, y, m = key
+    end = f"{y + 1:04d}-01-01" if m == 12 else f"{y:04d}-{m + 1:02d}-01"
+    by_day: Dict[str, List[Dict]] = {}
+    for e in calendar.list_events_between(f"{y:04d}-{m:02d}-01", end):
+        by_day.setdefault(e["start"][:10], []).append(e)
+    return by_day
+
+
+class PeriodPrefetcher:
+    """Bounded cache of period data, filled ahead of time on a worker thread.
+
+    The worker reads through its own connection (sqlite connections are tied
+    to the thread that opened them). Every request for new neighbours and
+    every calendar change bumps a generation counter; results computed for an
+    older generation are dropped, so quick navigation or a concurrent edit can
+    never put stale data in the cache.
+    """
+
+    def __init__(self, calendar: Calendar, max_entries: int = 12):
+        self.calendar = calendar
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Hashable, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        # Prefetching needs a second connection, which an in-memory DB can't share
+        self.enabled = getattr(calendar, "db_path", ":memory:") != ":memory:"
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch") if self.enabled else None
+        self._reader: Optional[Calendar] = None
+        calendar.add_listener(self._on_change)
+
+    def get(self, key: Tuple):
+        """Return data for key, from the cache or (on a miss) read right now."""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            generation = self._generation
+        data = fetch_period(self.calendar, key)
+        self._store(key, data, generation)
+        return data
+
+    def prefetch(self, keys: Iterable[Tuple]) -> None:
+        """Load keys in the background; supersedes any earlier prefetch."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            missing = [k for k in keys if k not in self._cache]
+        for key in missing:
+            self._executor.submit(self._load, key, generation)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def close(self) -> None:
+        self.calendar.remove_listener(self._on_change)
+        if self._executor:
+            # The reader connection must be closed on the thread that owns it
+            self._executor.submit(self._close_reader)
+            self._executor.shutdown(wait=True)
+
+    def _close_reader(self) -> None:
+        if self._reader is not None:
+            self._reader.conn.close()
+            self._reader = None
+
+    def _on_change(self, action: str, event: Dict) -> None:
+        self.invalidate()
+
+    def _load(self, key: Tuple, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation or key in self._cache:
+                return
+        try:
+            if self._reader is None:
+                self._reader = Calendar(self.calendar.db_path)
+            data = fetch_period(self._reader, key)
+        except Exception:
+            return
+        self._store(key, data, generation)
+
+    def _store(self, key: Tuple, data, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._cache[key] = data
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
@@ -0,0 +1,129 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .calendar import Calendar
+
+logger = logging.getLogger(__name__)
+
+# Longest single sleep; Condition.wait overflows past threading.TIMEOUT_MAX,
+# which an event in the far future (e.g. 9999-01-01) would otherwise reach
+MAX_WAIT_SECONDS = 3600
+
+
+class ReminderScheduler:
+    """Calls on_fire(event) lead_minutes before each upcoming event starts.
+
+    Upcoming events are kept in a min-heap keyed on fire time. The worker
+    thread sleeps until the earliest deadline and is only woken early when
+    the calendar reports a change, so an idle scheduler uses no CPU no matter
+    how many events are queued.
+    """
+
+    def __init__(self, calendar: Calendar, on_fire: Callable[[Dict], None],
+                 lead_minutes: int = 10, clock: Callable[[], float] = time.time):
+        self.calendar = calendar
+        self.on_fire = on_fire
+        self.lead_seconds = lead_minutes * 60
+        self.clock = clock
+        self._heap: List[tuple] = []
+        # id -> the heap entry that is still live; anything else is stale
+        self._entries: Dict[int, tuple] = {}
+        # (id, start) -> start time of reminders already delivered, so a
+        # reload() does not fire them again
+        self._fired: Dict[Tuple[int, str], float] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.reload()
+        self.calendar.add_listener(self._on_change)
+        self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.calendar.remove_listener(self._on_change)
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def reload(self) -> None:
+        """Re-read upcoming events from the calendar.
+
+        Changes made through this Calendar arrive through its listeners;
+        call this when another process may have written to the file. Must run
+        on the caller's thread: the sqlite connection belongs to it.
+        """
+        now = self.clock()
+        events = self.calendar.list_events_between(datetime.fromtimestamp(now).isoformat(timespec="seconds"))
+        with self._cond:
+            self._fired = {k: t for k, t in self._fired.items() if t >= now}
+            self._entries = {}
+            for e in events:
+                entry = self._make_entry(e)
+                if entry and (e["id"], e["start"]) not in self._fired:
+                    self._entries[e["id"]] = entry
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def pending(self) -> int:
+        """Number of reminders still waiting to fire."""
+        with self._cond:
+            return len(self._entries)
+
+    def _make_entry(self, event: Dict) -> Optional[tuple]:
+        try:
+            starts_at = datetime.fromisoformat(event["start"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return None
+        if starts_at < self.clock():
+            return None
+        # event ids are unique, so tuple comparison never reaches the dict
+        return (starts_at - self.lead_seconds, event["id"], event)
+
+    def _on_change(self, action: str, event: Dict) -> None:
+        with self._cond:
+            # Any change invalidates the old entry; it is skipped when popped.
+            self._entries.pop(event["id"], None)
+            # An edit that keeps the start (e.g. a new title) must not bring
+            # back a reminder that already fired, as in reload()
+            if action != "remove" and (event["id"], event["start"]) not in self._fired:
+                entry = self._make_entry(event)
+                if entry:
+                    self._entries[event["id"]] = entry
+                    heapq.heappush(self._heap, entry)
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._heap = list(self._entries.values())
+                heapq.heapify(self._heap)
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopped:
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - self.clock()
+                if delay > 0:
+                    self._cond.wait(min(delay, MAX_WAIT_SECONDS))
+                    continue
+                entry = heapq.heappop(self._heap)
+                if self._entries.get(entry[1]) is not entry:
+                    continue
+                del self._entries[entry[1]]
+                event = entry[2]
+                self._fired[(event["id"], event["start"])] = entry[0] + self.lead_seconds
+            try:
+                self.on_fire(event)
+            except Exception:
+                logger.exception("Delivering the reminder for event %s failed", event["id"])
@@ -0,0 +1,134 @@
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .calendar import Calendar
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+STOPWORDS = {
+    "what", "when", "where", "which", "who", "how", "have", "has", "had", "do", "does", "did",
+    "the", "and", "for", "with", "my", "me", "i", "is", "are", "am", "was", "any", "anything",
+    "there", "about", "you", "your", "can", "could", "should", "would", "will", "on", "at", "in",
+    "of", "to", "a", "an", "events", "event", "schedule", "scheduled", "calendar", "plans",
+    "going", "busy", "free", "next", "this", "day", "week", "month",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+def resolve_range(text: str, today: Optional[date] = None) -> Optional[Tuple[date, date]]:
+    """Map phrases like 'tomorrow' or 'next week' to a [start, end) date range."""
+    today = today or date.today()
+    low = text.lower()
+
+    m = re.search(r"\b(\d{4}-\d{2}-\d{2})\b", low)
+    if m:
+        try:
+            d = date.fromisoformat(m.group(1))
+            return d, d + timedelta(days=1)
+        except ValueError:
+            pass
+
+    if "day after tomorrow" in low:
+        d = today + timedelta(days=2)
+        return d, d + timedelta(days=1)
+    if "tomorrow" in low:
+        d = today + timedelta(days=1)
+        return d, d + timedelta(days=1)
+    if "yesterday" in low:
+        d = today - timedelta(days=1)
+        return d, d + timedelta(days=1)
+    if re.search(r"\btoday\b|\btonight\b", low):
+        return today, today + timedelta(days=1)
+
+    week_start = today - timedelta(days=today.weekday())
+    if "next week" in low:
+        return week_start + timedelta(days=7), week_start + timedelta(days=14)
+    if "this week" in low or "rest of the week" in low:
+        return today, week_start + timedelta(days=7)
+
+    month_start = today.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    if "next month" in low:
+        return next_month, (next_month + timedelta(days=32)).replace(day=1)
+    if "this month" in low:
+        return today, next_month
+
+    for i, name in enumerate(WEEKDAYS):
+        if re.search(rf"\b{name}\b", low):
+            ahead = (i - today.weekday()) % 7
+            if "next " + name in low and ahead == 0:
+                ahead = 7
+            d = today + timedelta(days=ahead)
+            return d, d + timedelta(days=1)
+    return None
+
+
+def keywords(text: str, max_terms: int = 3) -> List[str]:
+    """Pick the few most specific words of a question to match against titles."""
+    words = re.findall(r"[a-zA-Z][a-zA-Z'-]{2,}", text.lower())
+    terms = [w for w in dict.fromkeys(words) if w not in STOPWORDS]
+    return sorted(terms, key=len, reverse=True)[:max_terms]
+
+
+def render_events(events: List[Dict], max_tokens: int) -> str:
+    """Render events grouped by day, stopping once max_tokens is used up."""
+    lines: List[str] = []
+    used = 0
+    current_day = None
+    shown = 0
+    for e in events:
+        day, _, clock = e["start"].partition("T")
+        item = f"{clock[:5]} {e['title']} (#{e['id']})" if clock else f"{e['title']} (#{e['id']})"
+        if day != current_day:
+            piece = f"{day}: {item}"
+        else:
+            piece = f"; {item}"
+        cost = estimate_tokens(piece)
+        if used + cost > max_tokens:
+            break
+        if day != current_day:
+            lines.append(piece)
+            current_day = day
+        else:
+            lines[-1] += piece
+        used += cost
+        shown += 1
+    if shown < len(events):
+        lines.append("(more events not shown)")
+    return "\n".join(lines)
+
+
+def build_context(calendar: Calendar, question: str, max_tokens: int = 300,
+                  today: Optional[date] = None) -> str:
+    """Return a compact listing of the events relevant to question, or ''.
+
+    Only the resolved date window (or keyword matches from today on) is read,
+    and at most as many rows as could fit in max_tokens, so the prompt grows
+    with the scope of the question rather than with the size of the calendar.
+    """
+    if max_tokens <= 0:
+        return ""
+    today = today or date.today()
+    # Every rendered event costs at least a few tokens; one extra row tells
+    # us whether anything was cut.
+    limit = max_tokens // 4 + 1
+
+    rng = resolve_range(question, today)
+    if rng:
+        start, end = rng
+        events = calendar.list_events_between(start.isoformat(), end.isoformat(), limit=limit)
+        if not events:
+            return f"No events between {start.isoformat()} and {(end - timedelta(days=1)).isoformat()}."
+    else:
+        terms = keywords(question)
+        if not terms:
+            return ""
+        events = calendar.search_events(terms, since=today.isoformat(), limit=limit)
+        if not events:
+            return ""
+    return render_events(events, max_tokens)
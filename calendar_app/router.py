@@ -0,0 +1,215 @@
+import heapq
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .calendar import Calendar
+
+# Shard files are named after the calendar id, so keep ids filename-safe
+_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+# Archive files (calendar.2023.db) live next to shards but are not shards
+_ARCHIVE_RE = re.compile(r"\.\d{4}\.db$")
+
+
+class _Shard:
+    def __init__(self, calendar: Calendar, last_used: float):
+        self.calendar = calendar
+        # Connections are shared between threads, one user at a time
+        self.lock = threading.RLock()
+        self.users = 0
+        self.last_used = last_used
+
+
+class CalendarRouter:
+    """Hosts many calendars, each in its own SQLite file under root_dir.
+
+    Open shards are kept in an LRU pool of at most max_open connections;
+    shards unused for idle_timeout seconds are closed the next time the pool
+    is touched. Queries over every calendar run on a thread pool.
+    """
+
+    def __init__(self, root_dir: str, max_open: int = 32, idle_timeout: float = 300.0,
+                 max_workers: int = 8, clock: Callable[[], float] = time.monotonic):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._pool: "OrderedDict[str, _Shard]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._listeners: Dict[str, List[Callable[[str, Dict], None]]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="shard")
+
+    def shard_path(self, calendar_id: str) -> str:
+        if not _ID_RE.match(calendar_id):
+            raise ValueError(f"invalid calendar id: {calendar_id!r}")
+        return os.path.join(self.root_dir, f"{calendar_id}.db")
+
+    def calendar(self, calendar_id: str) -> "RoutedCalendar":
+        """A Calendar stand-in for calendar_id, e.g. ChatBot(router.calendar("alice"))."""
+        self.shard_path(calendar_id)
+        return RoutedCalendar(self, calendar_id)
+
+    def calendar_ids(self) -> List[str]:
+        """Every calendar that has a shard on disk."""
+        return sorted(
+            name[:-3] for name in os.listdir(self.root_dir)
+            if name.endswith(".db") and not _ARCHIVE_RE.search(name)
+        )
+
+    @contextmanager
+    def open(self, calendar_id: str) -> Iterator[Calendar]:
+        """Check the shard for calendar_id out of the pool for exclusive use."""
+        shard = self._checkout(calendar_id)
+        try:
+            with shard.lock:
+                yield shard.calendar
+        finally:
+            with self._lock:
+                shard.users -= 1
+                shard.last_used = self.clock()
+
+    def fan_out(self, fn: Callable[[Calendar], Any], calendar_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run fn(calendar) on every shard in parallel; returns {id: result}.
+
+        Shards already in the pool are used as-is; others get a short-lived
+        read-only connection so a fan-out does not flush the pool of active
+        users. fn must therefore only read.
+        """
+        ids = calendar_ids if calendar_ids is not None else self.calendar_ids()
+        futures = {cid: self._executor.submit(self._run_on, cid, fn) for cid in ids}
+        return {cid: f.result() for cid, f in futures.items()}
+
+    def events_on(self, date: str) -> List[Dict]:
+        """Everyone's events on date, merged by start time; each has a 'calendar' key."""
+        def on_date(cal: Calendar) -> List[Dict]:
+            return cal.list_events(date)
+
+        per_calendar = []
+        for cid, events in self.fan_out(on_date).items():
+            per_calendar.append([dict(e, calendar=cid) for e in events])
+        return list(heapq.merge(*per_calendar, key=lambda e: e["start"]))
+
+    def evict_idle(self) -> None:
+        """Close shards that have not been used for idle_timeout seconds."""
+        with self._lock:
+            self._evict(self.clock())
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            while self._pool:
+                _, shard = self._pool.popitem(last=False)
+                shard.calendar.conn.close()
+
+    def add_listener(self, calendar_id: str, callback: Callable[[str, Dict], None]) -> None:
+        """Like Calendar.add_listener; survives the shard being evicted and reopened."""
+        with self._lock:
+            self._listeners.setdefault(calendar_id, []).append(callback)
+            shard = self._pool.get(calendar_id)
+            if shard:
+                shard.calendar.add_listener(callback)
+
+    def remove_listener(self, calendar_id: str, callback: Callable[[str, Dict], None]) -> None:
+        with self._lock:
+            callbacks = self._listeners.get(calendar_id, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            shard = self._pool.get(calendar_id)
+            if shard:
+                shard.calendar.remove_listener(callback)
+
+    def _checkout(self, calendar_id: str) -> _Shard:
+        path = self.shard_path(calendar_id)
+        with self._lock:
+            shard = self._pool.get(calendar_id)
+            if shard is not None:
+                return self._claim(calendar_id, shard)
+        # Opening runs the schema setup and a commit; doing that outside the
+        # lock keeps one slow file from stalling checkouts of every other shard
+        cal = Calendar(path, check_same_thread=False)
+        with self._lock:
+            shard = self._pool.get(calendar_id)
+            if shard is None:
+                for callback in self._listeners.get(calendar_id, []):
+                    cal.add_listener(callback)
+                shard = _Shard(cal, self.clock())
+                self._pool[calendar_id] = shard
+                cal = None
+            claimed = self._claim(calendar_id, shard)
+        if cal is not None:
+            # Another thread opened the same shard first
+            cal.conn.close()
+        return claimed
+
+    def _claim(self, calendar_id: str, shard: _Shard) -> _Shard:
+        # Caller holds self._lock
+        now = self.clock()
+        self._pool.move_to_end(calendar_id)
+        shard.users += 1
+        shard.last_used = now
+        self._evict(now)
+        return shard
+
+    def _evict(self, now: float) -> None:
+        # Caller holds self._lock. Shards that are checked out are never closed.
+        for cid, shard in list(self._pool.items()):
+            over_capacity = len(self._pool) > self.max_open
+            idle = now - shard.last_used >= self.idle_timeout
+            if shard.users == 0 and (over_capacity or idle):
+                del self._pool[cid]
+                shard.calendar.conn.close()
+
+    def _run_on(self, calendar_id: str, fn: Callable[[Calendar], Any]) -> Any:
+        with self._lock:
+            pooled = calendar_id in self._pool
+        if pooled:
+            with self.open(calendar_id) as cal:
+                return fn(cal)
+        # Shards on disk were set up when they were written; just read them
+        cal = Calendar(self.shard_path(calendar_id), read_only=True)
+        try:
+            return fn(cal)
+        finally:
+            cal.conn.close()
+
+
+class RoutedCalendar:
+    """Calendar look-alike bound to one calendar id.
+
+    Every method call checks the shard out of the router for the duration of
+    the call, so the underlying connection can be evicted between calls
+    without the holder (e.g. a ChatBot) noticing.
+    """
+
+    def __init__(self, router: CalendarRouter, calendar_id: str):
+        self.router = router
+        self.calendar_id = calendar_id
+
+    def __getattr__(self, name: str):
+        if name.startswith("_") or not callable(getattr(Calendar, name, None)):
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            with self.router.open(self.calendar_id) as cal:
+                return getattr(cal, name)(*args, **kwargs)
+
+        return call
+
+    @contextmanager
+    def transaction(self) -> Iterator[Calendar]:
+        # Hold the shard for the whole block so it is one transaction
+        with self.router.open(self.calendar_id) as cal:
+            with cal.transaction():
+                yield cal
+
+    def add_listener(self, callback: Callable[[str, Dict], None]) -> None:
+        self.router.add_listener(self.calendar_id, callback)
+
+    def remove_listener(self, callback: Callable[[str, Dict], None]) -> None:
+        self.router.remove_listener(self.calendar_id, callback)
@@ -0,0 +1,202 @@
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .chatbot import ChatBot
+from .router import CalendarRouter
+
+DEFAULT_CALENDAR = "default"
+
+
+class CalendarHTTPServer(ThreadingHTTPServer):
+    """HTTP/1.1 JSON front end for a CalendarRouter.
+
+    Each connection gets a thread, which mostly sits idle waiting for the
+    next request on a keep-alive socket. Only database work holds a slot: at
+    most `workers` (by default the size of the router's connection pool)
+    run at once, so the server never has more requests in flight than
+    it has database connections to serve them, however many clients are
+    connected.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], router: CalendarRouter, workers: int = 0,
+                 llm: bool = False, verbose: bool = False):
+        super().__init__(address, CalendarRequestHandler)
+        self.router = router
+        self.llm = llm
+        self.verbose = verbose
+        self.slots = threading.BoundedSemaphore(workers or router.max_open)
+        self._bots: Dict[str, Tuple[ChatBot, threading.Lock]] = {}
+        self._bots_lock = threading.Lock()
+
+    def bot_for(self, calendar_id: str) -> Tuple[ChatBot, threading.Lock]:
+        """One ChatBot (and lock) per calendar, so conversations don't mix."""
+        with self._bots_lock:
+            if calendar_id not in self._bots:
+                bot = ChatBot(self.router.calendar(calendar_id), session=f"http-{calendar_id}", llm_enabled=self.llm)
+                self._bots[calendar_id] = (bot, threading.Lock())
+            return self._bots[calendar_id]
+
+
+class CalendarRequestHandler(BaseHTTPRequestHandler):
+    """Routes:
+
+    GET  /health
+    GET  /events?calendar=ID[&date=YYYY-MM-DD | &start=..&end=..][&limit=N]
+    GET  /everyone?date=YYYY-MM-DD          events of every calendar on a day
+    POST /events/batch  {"calendar": ID, "add": [{title, start, end?, description?}],
+                         "update": [{id, title?, start?, end?, description?}], "remove": [id]}
+    POST /chat          {"calendar": ID, "message": "..."}
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    # Headers and body are separate writes; without this, Nagle plus delayed
+    # ACKs add ~40ms to every response on a kept-alive connection
+    disable_nagle_algorithm = True
+    # Close keep-alive connections that stay idle, ending their thread
+    timeout = 15
+    server: CalendarHTTPServer
+
+    def do_GET(self):
+        self._dispatch({
+            "/health": self._health,
+            "/events": self._list_events,
+            "/everyone": self._everyone,
+        })
+
+    def do_POST(self):
+        self._dispatch({
+            "/events/batch": self._batch,
+            "/chat": self._chat,
+        })
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _dispatch(self, routes):
+        url = urlparse(self.path)
+        handler = routes.get(url.path)
+        self._body_read = False
+        if handler is None:
+            self._reply(404, {"error": f"no route for {self.command} {url.path}"})
+            return
+        try:
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            self._reply(200, handler(query))
+        except (ValueError, KeyError, TypeError) as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+
+    def _reply(self, status: int, obj) -> None:
+        # On a kept-alive connection an unread body would be parsed as the
+        # next request line, so consume it first (or give up the connection)
+        if not self._body_read:
+            try:
+                self._read_body()
+            except ValueError:
+                self.close_connection = True
+        self._send_json(status, obj)
+
+    def _read_body(self) -> bytes:
+        self._body_read = True
+        length = int(self.headers.get("Content-Length") or 0)
+        if length < 0:
+            raise ValueError("invalid Content-Length")
+        return self.rfile.read(length) if length else b""
+
+    def _read_json(self) -> Dict:
+        body = self._read_body() or b"{}"
+        data = json.loads(body.decode("utf-8"))
+        if not isinstance(data, dict):
+            raise ValueError("request body must be a JSON object")
+        return data
+
+    def _send_json(self, status: int, obj) -> None:
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _health(self, query):
+        return {"ok": True}
+
+    def _list_events(self, query):
+        cal = self.server.router.calendar(query.get("calendar", DEFAULT_CALENDAR))
+        limit = int(query["limit"]) if "limit" in query else None
+        with self.server.slots:
+            if "start" in query:
+                events = cal.list_events_between(query["start"], query.get("end"), limit)
+            else:
+                events = cal.list_events(query.get("date"))
+        if limit is not None:
+            events = events[:limit]
+        return {"events": events}
+
+    def _everyone(self, query):
+        with self.server.slots:
+            return {"events": self.server.router.events_on(query["date"])}
+
+    def _batch(self, query):
+        data = self._read_json()
+        cal = self.server.router.calendar(data.get("calendar", DEFAULT_CALENDAR))
+        added, removed = [], []
+        updates = {int(e["id"]): {k: v for k, v in e.items() if k != "id"} for e in data.get("update", [])}
+        removals = [int(eid) for eid in data.get("remove", [])]
+        # One shard checkout and one commit for the whole request
+        with self.server.slots, cal.transaction() as c:
+            # Archived events can only join the transaction if their files
+            # are attached before anything is written. This has to happen on
+            # the checked-out shard: between two checkouts it could be
+            # evicted and reopened without the attachments.
+            c.attach_archives(list(updates) + removals)
+            updated = [e["id"] for e in c.update_events(updates)] if updates else []
+            for e in data.get("add", []):
+                added.append(c.add_event(e["title"], e["start"], e.get("end"), e.get("description")))
+            for eid in removals:
+                removed.append(c.remove_event(eid))
+        return {"added": added, "updated": updated, "removed": removed}
+
+    def _chat(self, query):
+        data = self._read_json()
+        bot, lock = self.server.bot_for(data.get("calendar", DEFAULT_CALENDAR))
+        # Only the calendar work holds the bot and a database slot; the LLM
+        # wait does not, so a second message can arrive and cancel it
+        with self.server.slots, lock:
+            finish = bot.begin(str(data["message"]))
+        response, ok = finish()
+        return {"response": response, "ok": ok}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Local JSON HTTP service for calendars")
+    arg_parser.add_argument("--root", default="calendars", help="directory holding one .db file per calendar")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--pool", type=int, default=16, help="open database connections (and requests in flight)")
+    arg_parser.add_argument("--llm", action="store_true", help="let /chat fall back to the LLM")
+    arg_parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = arg_parser.parse_args()
+
+    router = CalendarRouter(args.root, max_open=args.pool)
+    server = CalendarHTTPServer((args.host, args.port), router, llm=args.llm, verbose=args.verbose)
+    print(f"Serving calendars from {args.root} on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        router.close()
+
+
+if __name__ == "__main__":
+    main()
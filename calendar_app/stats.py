@@ -0,0 +1,67 @@
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from .calendar import Calendar
+
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+class ScheduleStats:
+    """Busy hours, weekly load and event length for a range of events.
+
+    Nothing is loaded per event: hours come from a GROUP BY over the start
+    index, weekdays from the day_counts summary table and lengths from one
+    SUM, so a million events take well under a second.
+    """
+
+    def __init__(self, hours: List[int], days: Dict[str, int], total_minutes: float, with_end: int):
+        self.hours = hours
+        self.days = days
+        self.total_minutes = total_minutes
+        self.with_end = with_end
+        self.count = sum(hours)
+
+    @classmethod
+    def load(cls, calendar: Calendar, start: Optional[str] = None, end: Optional[str] = None) -> "ScheduleStats":
+        totals = calendar.schedule_totals(start, end)
+        return cls(totals["hours"], totals["days"], totals["minutes"], totals["with_end"])
+
+    def hour_histogram(self) -> List[int]:
+        """Number of events starting in each hour of the day (24 buckets)."""
+        return list(self.hours)
+
+    def weekday_histogram(self) -> List[int]:
+        """Number of events on each weekday, Monday first."""
+        # One entry per busy day, not per event, so a plain loop is enough
+        counts = [0] * 7
+        for day, n in self.days.items():
+            try:
+                counts[date.fromisoformat(day).weekday()] += n
+            except ValueError:
+                continue  # a start that is not an ISO date
+        return counts
+
+    def average_length_minutes(self) -> Tuple[Optional[float], int]:
+        """(mean length in minutes, number of events that have an end time)."""
+        if not self.with_end:
+            return None, 0
+        return self.total_minutes / self.with_end, self.with_end
+
+
+def format_hours(hist: List[int], top: int = 3) -> str:
+    ranked = sorted(((c, h) for h, c in enumerate(hist) if c), key=lambda x: (-x[0], x[1]))
+    if not ranked:
+        return "No events in that range."
+    return "Busiest hours: " + ", ".join(f"{h:02d}:00 ({c})" for c, h in ranked[:top])
+
+
+def format_weekdays(hist: List[int]) -> str:
+    if not any(hist):
+        return "No events in that range."
+    return "Events per weekday: " + ", ".join(f"{name} {n}" for name, n in zip(WEEKDAY_NAMES, hist))
+
+
+def format_length(avg: Optional[float], n: int) -> str:
+    if avg is None:
+        return "No events with an end time in that range."
+    return f"Average event length: {avg:.0f} min (over {n} event{'s' if n != 1 else ''} with an end time)"
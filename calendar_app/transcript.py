@@ -0,0 +1,62 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+
+def collapse(text: str, max_lines: int) -> Tuple[str, int]:
+    """Return (first max_lines of text, number of lines left out)."""
+    lines = text.split("\n")
+    if max_lines <= 0 or len(lines) <= max_lines:
+        return text, 0
+    return "\n".join(lines[:max_lines]), len(lines) - max_lines
+
+
+class TranscriptLog:
+    """Append-only on-disk record of a chat session (one JSON object per line).
+
+    The GUI only keeps the recent part of the conversation on screen; the
+    full history lives here and is scanned only when the user searches it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+    def append(self, who: str, text: str) -> None:
+        record = {"time": datetime.now().isoformat(timespec="seconds"), "who": who, "text": text}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """Return the most recent messages containing query (case-insensitive)."""
+        needle = query.lower()
+        matches: List[Dict] = []
+        if not os.path.exists(self.path):
+            return matches
+        with self._lock, open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if needle in record.get("text", "").lower():
+                    matches.append(record)
+                    if len(matches) > limit:
+                        matches.pop(0)
+        return matches
+
+
+def format_matches(matches: List[Dict], max_chars: int = 200) -> str:
+    if not matches:
+        return "No matching messages in the history."
+    lines = []
+    for m in matches:
+        text = m["text"].replace("\n", " ")
+        if len(text) > max_chars:
+            text = text[:max_chars] + "…"
+        lines.append(f"[{m['time']}] {m['who']}: {text}")
+    return "\n".join(lines)
@@ -1,14 +1,128 @@
+import argparse
+import json
+import logging
 import os
+import sys
+import time
 
 from calendar_app.calendar import Calendar
 from calendar_app.chatbot import ChatBot
+from calendar_app.reminders import ReminderScheduler
+
+
+def run_reminders(cal: Calendar, lead_minutes: int, poll_seconds: float = 5.0):
+    """Headless mode: print a line for each reminder until interrupted.
+
+    Events are added from other processes (the chat CLI, the GUI), so the
+    file's data_version is polled and the reminders reloaded when it moves.
+    """
+    def on_fire(event):
+        print(f"Reminder: {event['title']} at {event['start']}", flush=True)
+
+    scheduler = ReminderScheduler(cal, on_fire, lead_minutes=lead_minutes)
+    scheduler.start()
+    print(f"Watching {scheduler.pending()} upcoming event(s). Press Ctrl+C to stop.")
+    version = cal.data_version()
+    try:
+        while True:
+            time.sleep(poll_seconds)
+            if cal.data_version() != version:
+                version = cal.data_version()
+                scheduler.reload()
+    except KeyboardInterrupt:
+        print("\nGoodbye")
+    finally:
+        scheduler.stop()
+
+
+class _CommandFailed(Exception):
+    """Rolls back a batch command that reported an error."""
+
+
+def run_batch(bot: ChatBot, lines, out=sys.stdout) -> int:
+    """Run chatbot commands from lines in one transaction, writing JSON lines.
+
+    Blank lines and lines starting with '#' are skipped; 'quit'/'exit' stops.
+    Each command runs in a nested transaction, so one that fails leaves none
+    of its writes behind. Returns the number of commands that failed.
+    """
+    failed = 0
+    with bot.calendar.transaction():
+        for lineno, raw in enumerate(lines, start=1):
+            text = raw.strip()
+            if not text or text.startswith("#"):
+                continue
+            if text.lower() in ("quit", "exit"):
+                break
+            try:
+                with bot.calendar.transaction():
+                    resp = bot.respond(text)
+                    ok = bot.last_ok
+                    if not ok:
+                        raise _CommandFailed()
+            except _CommandFailed:
+                pass
+            except Exception as e:
+                resp = f"Error: {e}"
+                ok = False
+            if not ok:
+                failed += 1
+            out.write(json.dumps({"line": lineno, "command": text,
+                                  "status": "ok" if ok else "error", "response": resp}) + "\n")
+    return failed
 
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Calendar Chatbot CLI")
+    arg_parser.add_argument("--reminders", action="store_true",
+                            help="run headless, printing event reminders instead of chatting")
+    arg_parser.add_argument("--lead", type=int, default=10, metavar="MINUTES",
+                            help="how long before an event its reminder fires (default: 10)")
+    arg_parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                            help="run commands from FILE (or stdin) in one transaction, printing JSON lines")
+    arg_parser.add_argument("--archive-before", type=int, metavar="YYYY",
+                            help="move events from before YYYY into per-year archive files and exit")
+    arg_parser.add_argument("--merge-from", metavar="DB",
+                            help="apply changes made in another calendar.db, print the next sync token and exit")
+    arg_parser.add_argument("--since", metavar="TOKEN",
+                            help="with --merge-from, only pull changes after this token")
+    arg_parser.add_argument("--llm", action="store_true",
+                            help="in batch mode, send non-command lines to the LLM instead of failing them")
+    args = arg_parser.parse_args()
+
     # store DB in local file in project folder
     db_path = os.path.join(os.path.dirname(__file__), "calendar.db")
     cal = Calendar(db_path)
+
+    if args.reminders:
+        logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+        run_reminders(cal, args.lead)
+        return
+
+    if args.archive_before:
+        moved = cal.archive_before(args.archive_before)
+        print(f"Archived {moved} event(s) from before {args.archive_before}.")
+        return
+
+    if args.merge_from:
+        try:
+            print(cal.merge_from(args.merge_from, args.since))
+        except (FileNotFoundError, ValueError) as e:
+            sys.exit(f"Error: {e}")
+        return
+
+    if args.batch:
+        bot = ChatBot(cal, llm_enabled=args.llm)
+        if args.batch == "-":
+            failed = run_batch(bot, sys.stdin)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                failed = run_batch(bot, f)
+        sys.exit(1 if failed else 0)
+
     bot = ChatBot(cal)
+    # load the model while the user types their first message
+    bot.warm_up()
 
     print("Calendar Chatbot — type 'help' for commands. Type 'quit' or 'exit' to stop.")
     while True:
@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 
@@ -7,10 +8,16 @@ from calendar_app.gui import ChatGUI
 
 
 def main():
+    arg_parser = argparse.ArgumentParser(description="Calendar Chatbot GUI")
+    arg_parser.add_argument("--replica", action="store_true",
+                            help="serve calendar reads from an in-memory copy of calendar.db")
+    args = arg_parser.parse_args()
+
     db_path = os.path.join(os.path.dirname(__file__), "calendar.db")
-    cal = Calendar(db_path)
+    cal = Calendar(db_path, replica=args.replica)
     bot = ChatBot(cal)
-    gui = ChatGUI(bot, title="Calendar Chatbot GUI")
+    history_path = os.path.join(os.path.dirname(__file__), "chat_history.log")
+    gui = ChatGUI(bot, title="Calendar Chatbot GUI", history_path=history_path)
     gui.run()
 
 
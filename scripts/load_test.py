@@ -0,0 +1,77 @@
+"""Load test for the calendar HTTP service (python -m calendar_app.server).
+
+Each client thread keeps one keep-alive connection open and alternates
+batched adds with range queries against its own calendar. Use more
+clients than the server's --pool to check that idle connections don't
+starve the others.
+
+    python -m calendar_app.server --pool 4
+    python scripts/load_test.py --clients 16 --requests 200 --batch 50
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+
+
+def run_client(host, port, client_id, requests, batch, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    calendar = f"load{client_id}"
+    for i in range(requests):
+        if i % 2 == 0:
+            events = [{"title": f"Event {i}-{j}", "start": f"2025-{1 + j % 12:02d}-{1 + j % 28:02d} {j % 24:02d}:00"}
+                      for j in range(batch)]
+            body = json.dumps({"calendar": calendar, "add": events})
+            method, path = "POST", "/events/batch"
+        else:
+            body = None
+            method, path = "GET", f"/events?calendar={calendar}&start=2025-03-01&end=2025-04-01&limit=100"
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--clients", type=int, default=32)
+    arg_parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    arg_parser.add_argument("--batch", type=int, default=50, help="events per batched add")
+    args = arg_parser.parse_args()
+
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=run_client,
+                         args=(args.host, args.port, c, args.requests, args.batch, latencies, errors))
+        for c in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    total = len(latencies)
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s), {len(errors)} errors")
+    if total:
+        p = lambda q: latencies[min(total - 1, int(q * total))] * 1000
+        print(f"latency ms: median {statistics.median(latencies) * 1000:.1f}  p95 {p(0.95):.1f}  p99 {p(0.99):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import io
+import json
+
+from calendar_app.calendar import Calendar
+from calendar_app.chatbot import ChatBot
+from main import run_batch
+
+
+class BatchModeTests(unittest.TestCase):
+    def setUp(self):
+        self.cal = Calendar(":memory:")
+        self.bot = ChatBot(self.cal, llm_enabled=False)
+
+    def tearDown(self):
+        self.cal.conn.close()
+
+    def test_json_lines_with_status(self):
+        script = [
+            "# setup\n",
+            "add Standup on 2025-11-20 at 09:00\n",
+            "\n",
+            "what is the weather\n",
+            "remove 99\n",
+            "list on 2025-11-20\n",
+        ]
+        out = io.StringIO()
+        failed = run_batch(self.bot, script, out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r["line"] for r in rows], [2, 4, 5, 6])
+        self.assertEqual([r["status"] for r in rows], ["ok", "error", "error", "ok"])
+        self.assertIn("Standup", rows[3]["response"])
+        self.assertEqual(failed, 2)
+
+    def test_failed_command_leaves_no_writes(self):
+        real_add = self.bot._handle_add
+
+        def add_then_fail(body):
+            real_add(body)
+            if "bad" in body:
+                return self.bot._fail("failed after writing")
+            if "boom" in body:
+                raise RuntimeError("crashed after writing")
+            return "ok"
+
+        self.bot._handle_add = add_then_fail
+        out = io.StringIO()
+        failed = run_batch(self.bot, ["add A on 2025-06-01", "add bad on 2025-06-01",
+                                      "add boom on 2025-06-01", "add B on 2025-06-01"], out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r["status"] for r in rows], ["ok", "error", "error", "ok"])
+        self.assertEqual(failed, 2)
+        self.assertEqual([e["title"] for e in self.cal.list_events()], ["A", "B"])
+
+    def test_single_transaction(self):
+        seen = []
+        self.cal.add_listener(lambda action, event: seen.append(action))
+        commits = []
+        self.cal.conn.set_trace_callback(lambda sql: commits.append(sql) if sql.upper().startswith("COMMIT") else None)
+        run_batch(self.bot, [f"add Event {i} on 2025-11-20 at 10:00" for i in range(20)], io.StringIO())
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(len(seen), 20)
+        self.assertEqual(len(self.cal.list_events()), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,8 +5,11 @@ import sys
 # Ensure repository root is on sys.path so tests can be run by executing the
 # file directly (e.g. `python tests/test_calendar.py`) without ModuleNotFoundError
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import sqlite3
 import tempfile
+import time
 import os
+from datetime import timedelta
 
 from calendar_app.calendar import Calendar
 
@@ -58,6 +61,390 @@ class CalendarTests(unittest.TestCase):
                 cal.conn.close()
             os.unlink(db_path)
 
+    def test_day_counts_follow_changes(self):
+        fd, db_path = tempfile.mkstemp()
+        os.close(fd)
+        cal = None
+        try:
+            cal = Calendar(db_path)
+            a = cal.add_event("One", "2025-11-12 09:00")
+            cal.add_event("Two", "2025-11-12 14:00")
+            b = cal.add_event("Three", "2025-11-13 10:00")
+            cal.add_event("Next year", "2026-01-01 10:00")
+            self.assertEqual(cal.day_counts(2025), {"2025-11-12": 2, "2025-11-13": 1})
+            cal.remove_event(b)
+            cal.conn.execute("UPDATE events SET start = ? WHERE id = ?", ("2025-12-01T09:00:00", a))
+            self.assertEqual(cal.day_counts(2025), {"2025-11-12": 1, "2025-12-01": 1})
+        finally:
+            if cal:
+                cal.conn.close()
+            os.unlink(db_path)
+
+    def test_archive_is_transparent(self):
+        with tempfile.TemporaryDirectory() as d:
+            db_path = os.path.join(d, "calendar.db")
+            cal = Calendar(db_path)
+            try:
+                old = cal.add_event("Old", "2022-03-01 09:00")
+                cal.add_event("Older", "2021-06-01 09:00")
+                cal.add_event("Current", "2025-11-12 09:00")
+                self.assertEqual(cal.archive_before(2025), 2)
+                self.assertTrue(os.path.exists(os.path.join(d, "calendar.2022.db")))
+                remaining = cal.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+                self.assertEqual(remaining, 1)
+
+                # current-period queries never attach an archive
+                self.assertEqual([e["title"] for e in cal.list_events("2025-11-12")], ["Current"])
+                self.assertEqual(cal._attached, {})
+
+                self.assertEqual([e["title"] for e in cal.list_events()], ["Older", "Old", "Current"])
+                self.assertEqual([e["title"] for e in cal.list_events("2022-03-01")], ["Old"])
+                self.assertEqual(cal.day_counts(2022), {"2022-03-01": 1})
+                self.assertTrue(cal.remove_event(old))
+                self.assertEqual(cal.list_events("2022-03-01"), [])
+            finally:
+                cal.conn.close()
+
+    def test_replica_serves_reads_and_mirrors_writes(self):
+        with tempfile.TemporaryDirectory() as d:
+            db_path = os.path.join(d, "calendar.db")
+            seed = Calendar(db_path)
+            seed.add_event("Existing", "2025-11-11 10:00")
+            seed.conn.close()
+
+            cal = Calendar(db_path, replica=True)
+            try:
+                self.assertEqual([e["title"] for e in cal.list_events()], ["Existing"])
+                eid = cal.add_event("New", "2025-11-12 10:00")
+                cal.remove_event(1)
+                disk = cal.conn.execute("SELECT id FROM events").fetchall()
+                memory = cal.replica.execute("SELECT id FROM events").fetchall()
+                self.assertEqual(disk, [(eid,)])
+                self.assertEqual(memory, [(eid,)])
+                self.assertEqual(cal.day_counts(2025), {"2025-11-12": 1})
+                self.assertTrue(cal.check_replica())
+
+                # A write from another process is picked up by the check
+                other = Calendar(db_path)
+                other.add_event("Elsewhere", "2025-11-13 10:00")
+                other.conn.close()
+                self.assertFalse(cal.check_replica())
+                self.assertEqual(len(cal.list_events()), 2)
+                self.assertTrue(cal.check_replica())
+
+                # ...as is an edit that keeps ids and lengths the same
+                other = Calendar(db_path)
+                other.update_event(eid, start="2025-11-14 15:30", title="Rew")
+                other.conn.close()
+                self.assertFalse(cal.check_replica())
+                self.assertEqual(cal.list_events("2025-11-14")[0]["title"], "Rew")
+                self.assertEqual(cal.day_counts(2025), {"2025-11-13": 1, "2025-11-14": 1})
+            finally:
+                cal.conn.close()
+                cal.replica.close()
+
+    def test_update_in_place(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"), replica=True)
+            seen = []
+            cal.add_listener(lambda action, event: seen.append((action, event["id"])))
+            try:
+                eid = cal.add_event("Dentist", "2025-11-12 09:00", "2025-11-12 10:00", "bring card")
+                token = cal.changes_since()["token"]
+                event = cal.update_event(eid, title="Dentist (moved)", start="2025-11-14 09:30")
+                self.assertEqual(event["id"], eid)
+                self.assertEqual(event["start"], "2025-11-14T09:30:00")
+                self.assertEqual(event["end"], "2025-11-12T10:00:00")
+                self.assertEqual(event["description"], "bring card")
+                self.assertEqual(cal.list_events("2025-11-14"), [event])
+                self.assertEqual(cal.day_counts(2025), {"2025-11-14": 1})
+                self.assertTrue(cal.check_replica())
+                self.assertEqual([r["id"] for r in cal.changes_since(token)["upserts"]], [eid])
+                self.assertEqual(seen, [("add", eid), ("update", eid)])
+
+                # an edit that changes nothing writes nothing
+                token = cal.changes_since()["token"]
+                cal.update_event(eid, title="Dentist (moved)")
+                self.assertEqual(cal.changes_since(token)["upserts"], [])
+                self.assertEqual(len(seen), 2)
+
+                self.assertIsNone(cal.update_event(999, title="Nope"))
+                with self.assertRaises(ValueError):
+                    cal.update_event(eid, colour="red")
+                with self.assertRaises(ValueError):
+                    cal.update_event(eid, title=" ")
+            finally:
+                cal.conn.close()
+                cal.replica.close()
+
+    def test_shift_series_and_archived_events(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"))
+            try:
+                old = cal.add_event("Old", "2022-03-01 09:00")
+                late = cal.add_event("Late", "2022-12-31 23:30")
+                cal.archive_before(2025)
+                series = [cal.add_event("Standup", f"2025-11-{d:02d} 09:00", f"2025-11-{d:02d} 09:15")
+                          for d in range(10, 15)]
+                self.assertEqual(cal.shift_events(series + [old, 999], timedelta(hours=1)), 6)
+                standups = cal.list_events_between("2025-11-10", "2025-11-15")
+                self.assertEqual([e["start"][11:16] for e in standups], ["10:00"] * 5)
+                self.assertEqual([e["end"][11:16] for e in standups], ["10:15"] * 5)
+                self.assertEqual(cal.get_event(old)["start"], "2022-03-01T10:00:00")
+
+                # moving an archived event out of its year brings it back to the main file
+                cal.update_event(late, start="2023-01-01 00:30")
+                self.assertEqual([e["id"] for e in cal.list_events("2023-01-01")], [late])
+                self.assertEqual(cal.list_events("2022-12-31"), [])
+            finally:
+                cal.conn.close()
+
+    def test_replica_only_mirrors_archived_events_that_changed(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"), replica=True)
+            try:
+                a = cal.add_event("A", "2022-03-01 09:00")
+                b = cal.add_event("B", "2022-04-01 09:00")
+                cal.archive_before(2025)
+                cal.update_events({a: {"title": "A"}, b: {"title": "B2"}})
+                self.assertEqual([(e["id"], e["title"]) for e in cal.list_events()], [(a, "A"), (b, "B2")])
+                self.assertTrue(cal.check_replica())
+            finally:
+                cal.conn.close()
+
+    def test_archived_removes_roll_back_with_the_transaction(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"))
+            try:
+                old = cal.add_event("Old", "2022-03-01 09:00")
+                cal.archive_before(2025)
+                with self.assertRaises(KeyError):
+                    with cal.transaction():
+                        self.assertTrue(cal.remove_event(old))
+                        cal.add_event("New", "2025-11-12 09:00")
+                        raise KeyError("abort")
+                self.assertEqual([e["title"] for e in cal.list_events()], ["Old"])
+
+                cal._detach_archives()
+                with self.assertRaises(ValueError):
+                    with cal.transaction():
+                        cal.add_event("New", "2025-11-12 09:00")
+                        cal.remove_event(old)
+                self.assertEqual([e["title"] for e in cal.list_events()], ["Old"])
+
+                cal.attach_archives([old])
+                with cal.transaction():
+                    cal.add_event("New", "2025-11-12 09:00")
+                    self.assertTrue(cal.remove_event(old))
+                self.assertEqual([e["title"] for e in cal.list_events()], ["New"])
+            finally:
+                cal.conn.close()
+
+    def test_archived_edits_roll_back_with_the_transaction(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"))
+            try:
+                late = cal.add_event("Late", "2022-12-31 23:30")
+                cal.archive_before(2025)
+
+                # edited first: the archive is attached and shares the transaction
+                with self.assertRaises(KeyError):
+                    with cal.transaction():
+                        cal.update_event(late, start="2023-01-01 00:30")
+                        cal.add_event("New", "2025-11-12 09:00")
+                        raise KeyError("abort")
+                self.assertEqual(cal.get_event(late)["start"], "2022-12-31T23:30:00")
+                self.assertEqual([e["title"] for e in cal.list_events()], ["Late"])
+
+                # after other writes the archive can't join the transaction: refused
+                cal._detach_archives()
+                with self.assertRaises(ValueError):
+                    with cal.transaction():
+                        cal.add_event("New", "2025-11-12 09:00")
+                        cal.update_event(late, start="2023-01-01 00:30")
+                self.assertEqual(cal.get_event(late)["start"], "2022-12-31T23:30:00")
+                self.assertEqual([e["title"] for e in cal.list_events()], ["Late"])
+            finally:
+                cal.conn.close()
+
+    def test_failed_nested_block_rolls_back_only_itself(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"), replica=True)
+            try:
+                old = cal.add_event("Old", "2022-03-01 09:00")
+                live = cal.add_event("Live", "2025-11-10 10:00")
+                cal.archive_before(2025)
+                cal._detach_archives()
+                seen = []
+                cal.add_listener(lambda action, event: seen.append(action))
+                with cal.transaction():
+                    cal.add_event("New", "2025-11-12 09:00")
+                    # the live event is edited after the archive is refused
+                    with self.assertRaises(ValueError):
+                        cal.shift_events([live, old], timedelta(hours=1))
+                    with self.assertRaises(KeyError):
+                        with cal.transaction():
+                            cal.remove_event(live)
+                            raise KeyError("abort")
+                self.assertEqual(seen, ["add"])
+                self.assertEqual(cal.get_event(live)["start"], "2025-11-10T10:00:00")
+                self.assertEqual(cal.get_event(old)["start"], "2022-03-01T09:00:00")
+                self.assertEqual([e["title"] for e in cal.list_events()], ["Old", "Live", "New"])
+                self.assertTrue(cal.check_replica())
+            finally:
+                cal.conn.close()
+
+    def test_change_feed_and_merge(self):
+        with tempfile.TemporaryDirectory() as d:
+            primary = Calendar(os.path.join(d, "primary.db"))
+            mirror = Calendar(os.path.join(d, "mirror.db"))
+            try:
+                a = primary.add_event("Keep", "2025-11-11 10:00")
+                b = primary.add_event("Drop", "2025-11-12 10:00")
+                primary.conn.commit()
+                token = mirror.merge_from(primary.db_path)
+                self.assertEqual([e["title"] for e in mirror.list_events()], ["Keep", "Drop"])
+
+                # nothing new since the token
+                empty = primary.changes_since(token)
+                self.assertEqual((empty["upserts"], empty["deletes"]), ([], []))
+
+                primary.remove_event(b)
+                primary.conn.execute("UPDATE events SET title = 'Kept' WHERE id = ?", (a,))
+                primary.conn.commit()
+                changes = primary.changes_since(token)
+                self.assertEqual([r["id"] for r in changes["upserts"]], [a])
+                self.assertEqual([t["id"] for t in changes["deletes"]], [b])
+
+                mirror.merge_from(primary.db_path, token)
+                self.assertEqual([e["title"] for e in mirror.list_events()], ["Kept"])
+            finally:
+                primary.conn.close()
+                mirror.conn.close()
+
+    def test_merged_rows_reach_further_mirrors(self):
+        with tempfile.TemporaryDirectory() as d:
+            a, b, c = (Calendar(os.path.join(d, f"{n}.db")) for n in "abc")
+            try:
+                eid = a.add_event("Event", "2025-11-11 10:00")
+                token_a = b.merge_from(a.db_path)
+                token_b = c.merge_from(b.db_path)
+
+                a.update_event(eid, title="Edited on a")
+                b.add_event("Added on b", "2025-11-12 10:00")
+                token_b = c.merge_from(b.db_path, token_b)
+                # b merges a's edit after c's watermark has moved past its time
+                b.merge_from(a.db_path, token_a)
+                c.merge_from(b.db_path, token_b)
+                self.assertEqual(c.get_event(eid)["title"], "Edited on a")
+
+                # last writer wins on the time of the edit, not of the merge
+                b.update_event(eid, title="Edited on b")
+                time.sleep(0.05)  # stamps are wall-clock milliseconds
+                a.update_event(eid, title="Edited on a again")
+                b.merge_from(a.db_path, token_a)
+                self.assertEqual(b.get_event(eid)["title"], "Edited on a again")
+            finally:
+                for cal in (a, b, c):
+                    cal.conn.close()
+
+    def test_merge_keeps_events_added_on_both_copies(self):
+        with tempfile.TemporaryDirectory() as d:
+            a, b = (Calendar(os.path.join(d, f"{n}.db")) for n in "ab")
+            try:
+                only_a = a.add_event("only in A", "2025-11-11 10:00")
+                only_b = b.add_event("only in B", "2025-11-12 10:00")
+                self.assertEqual(only_a, only_b)  # both copies handed out the same id
+                token_b = a.merge_from(b.db_path)
+                token_a = b.merge_from(a.db_path)
+                for cal in (a, b):
+                    self.assertEqual(sorted(e["title"] for e in cal.list_events()), ["only in A", "only in B"])
+
+                # ids are local; deletes still find the right event
+                b.remove_event(only_b)
+                a.merge_from(b.db_path, token_b)
+                b.merge_from(a.db_path, token_a)
+                for cal in (a, b):
+                    self.assertEqual([e["title"] for e in cal.list_events()], ["only in A"])
+            finally:
+                a.conn.close()
+                b.conn.close()
+
+    def test_merge_into_archived_events(self):
+        with tempfile.TemporaryDirectory() as d:
+            primary = Calendar(os.path.join(d, "primary.db"))
+            mirror = Calendar(os.path.join(d, "mirror.db"))
+            try:
+                old = primary.add_event("old", "2022-03-01 09:00")
+                gone = primary.add_event("gone", "2022-04-01 09:00")
+                token = mirror.merge_from(primary.db_path)
+                mirror.archive_before(2025)
+
+                primary.update_event(old, title="old renamed")
+                primary.remove_event(gone)
+                mirror.merge_from(primary.db_path, token)
+                self.assertEqual([(e["id"], e["title"]) for e in mirror.list_events()], [(old, "old renamed")])
+            finally:
+                primary.conn.close()
+                mirror.conn.close()
+
+    def test_merge_from_only_reads_an_existing_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"))
+            try:
+                typo = os.path.join(d, "calender.db")
+                with self.assertRaises(FileNotFoundError):
+                    cal.merge_from(typo)
+                self.assertFalse(os.path.exists(typo))
+
+                legacy = os.path.join(d, "legacy.db")
+                conn = sqlite3.connect(legacy)
+                conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, title TEXT, start TEXT, end TEXT, "
+                             "description TEXT)")
+                conn.commit()
+                conn.close()
+                with self.assertRaises(ValueError):
+                    cal.merge_from(legacy)
+                conn = sqlite3.connect(legacy)
+                tables = [r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+                conn.close()
+                self.assertEqual(tables, ["events"])
+            finally:
+                cal.conn.close()
+
+    def test_archived_changes_are_in_the_change_feed(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"))
+            try:
+                keep = cal.add_event("Edited", "2022-03-01 09:00")
+                drop = cal.add_event("Dropped", "2022-04-01 09:00")
+                cal.archive_before(2025)
+                token = cal.changes_since()["token"]
+                cal.update_event(keep, title="Edited later")
+                cal.remove_event(drop)
+                changes = cal.changes_since(token)
+                self.assertEqual([(r["id"], r["title"]) for r in changes["upserts"]], [(keep, "Edited later")])
+                self.assertEqual([t["id"] for t in changes["deletes"]], [drop])
+                self.assertEqual(cal.list_events(), [cal.get_event(keep)])
+                self.assertEqual(cal.day_counts(2022), {"2022-03-01": 1})
+            finally:
+                cal.conn.close()
+
+    def test_merge_keeps_replica_day_counts(self):
+        with tempfile.TemporaryDirectory() as d:
+            primary = Calendar(os.path.join(d, "primary.db"))
+            mirror = Calendar(os.path.join(d, "mirror.db"), replica=True)
+            try:
+                a = primary.add_event("Keep", "2025-11-11 10:00")
+                token = mirror.merge_from(primary.db_path)
+                primary.update_event(a, title="Kept")
+                mirror.merge_from(primary.db_path, token)
+                self.assertEqual(mirror.day_counts(2025), {"2025-11-11": 1})
+                self.assertTrue(mirror.check_replica())
+            finally:
+                primary.conn.close()
+                mirror.conn.close()
+
 
 if __name__ == '__main__':
     unittest.main()
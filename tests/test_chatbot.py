@@ -0,0 +1,143 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import threading
+import time
+from unittest import mock
+
+from calendar_app.calendar import Calendar
+from calendar_app.chatbot import ChatBot, SYSTEM_PROMPT
+from calendar_app.llm import LLMRequestManager
+
+
+def _fake_stream(context):
+    chunks = [{"response": "Hi", "done": False}, {"response": "!", "done": True, "context": context}]
+    resp = mock.Mock()
+    resp.iter_lines.return_value = [json.dumps(c).encode("utf-8") for c in chunks]
+    return resp
+
+
+class ChatBotLLMTests(unittest.TestCase):
+    def setUp(self):
+        self.cal = Calendar(":memory:")
+        self.post = mock.Mock()
+        self.bot = ChatBot(self.cal, keep_alive="1h", max_context=5, llm=LLMRequestManager(post=self.post))
+
+    def tearDown(self):
+        self.cal.conn.close()
+
+    def test_context_is_reused_between_turns(self):
+        self.post.side_effect = lambda *a, **kw: _fake_stream([1, 2, 3])
+        self.assertEqual(self.bot.ask_llm("hello"), "Hi!")
+        first = self.post.call_args.kwargs["json"]
+        self.assertIn(SYSTEM_PROMPT, first["prompt"])
+        self.assertEqual(first["keep_alive"], "1h")
+        self.assertNotIn("context", first)
+
+        self.bot.ask_llm("again")
+        second = self.post.call_args.kwargs["json"]
+        self.assertEqual(second["context"], [1, 2, 3])
+        self.assertNotIn(SYSTEM_PROMPT, second["prompt"])
+
+    def test_context_is_bounded_and_resettable(self):
+        self.post.return_value = _fake_stream(list(range(10)))
+        self.bot.ask_llm("hello")
+        self.assertIsNone(self.bot._context)
+
+        self.post.return_value = _fake_stream([1])
+        self.bot.ask_llm("hello")
+        self.assertEqual(self.bot._context, [1])
+        self.assertEqual(self.bot.respond("reset"), "Conversation reset.")
+        self.assertIsNone(self.bot._context)
+
+
+class ChatBotBeginTests(unittest.TestCase):
+    def setUp(self):
+        self.cal = Calendar(":memory:")
+        self.release = threading.Event()
+        self.streams = []
+        self.bot = ChatBot(self.cal, llm=LLMRequestManager(post=self._post))
+
+    def tearDown(self):
+        self.cal.conn.close()
+
+    def _post(self, url, headers=None, json=None, stream=False):
+        resp = mock.Mock()
+        resp.closed = False
+
+        def lines():
+            self.release.wait(5)
+            if resp.closed:
+                raise ConnectionError("stream closed")
+            yield b'{"response": "Answer", "done": true, "context": [1]}'
+
+        def close():
+            resp.closed = True
+            self.release.set()
+
+        resp.iter_lines.side_effect = lines
+        resp.close.side_effect = close
+        self.streams.append(resp)
+        return resp
+
+    def _finish_in_thread(self, finish):
+        out = {}
+        t = threading.Thread(target=lambda: out.update(result=finish()))
+        t.start()
+        return t, out
+
+    def test_commands_answer_while_llm_streams_and_new_question_cancels(self):
+        first, first_out = self._finish_in_thread(self.bot.begin("what is on my mind"))
+        deadline = time.time() + 2
+        while not self.streams and time.time() < deadline:
+            time.sleep(0.01)
+
+        # a command is answered right away, on this thread
+        reply, ok = self.bot.begin("add Gym on 2025-11-20 at 07:00")()
+        self.assertTrue(ok)
+        self.assertIn("Added event", reply)
+
+        second, second_out = self._finish_in_thread(self.bot.begin("and tomorrow?"))
+        first.join(2)
+        self.assertEqual(first_out["result"][1], False)
+        self.assertIn("Skipped", first_out["result"][0])
+        self.release.set()
+        second.join(2)
+        self.assertEqual(second_out["result"], ("Answer", True))
+
+
+class ChatBotEditTests(unittest.TestCase):
+    def setUp(self):
+        self.cal = Calendar(":memory:")
+        self.bot = ChatBot(self.cal, llm_enabled=False)
+
+    def tearDown(self):
+        self.cal.conn.close()
+
+    def test_edit_keeps_id_and_duration(self):
+        eid = self.cal.add_event("Review", "2025-11-20 14:00", "2025-11-20 15:00")
+        reply = self.bot.respond(f"edit {eid} title Design review on 2025-11-21 at 16:30")
+        self.assertEqual(reply, f"Updated event #{eid}: Design review at 2025-11-21T16:30:00")
+        event = self.cal.get_event(eid)
+        self.assertEqual(event["end"], "2025-11-21T17:30:00")
+        self.bot.respond(f"edit {eid} at 09:00")
+        self.assertEqual(self.cal.get_event(eid)["start"], "2025-11-21T09:00:00")
+        self.bot.respond("edit 99 at 09:00")
+        self.assertFalse(self.bot.last_ok)
+        self.bot.respond(f"edit {eid}")
+        self.assertFalse(self.bot.last_ok)
+
+    def test_shift_many(self):
+        ids = [self.cal.add_event("Class", f"2025-11-{d} 08:00") for d in (17, 19, 21)]
+        reply = self.bot.respond(f"shift {ids[0]}, {ids[1]},{ids[2]} by -30 minutes")
+        self.assertEqual(reply, "Moved 3 events.")
+        self.assertEqual([e["start"][11:16] for e in self.cal.list_events()], ["07:30"] * 3)
+        self.bot.respond("shift 1 by soon")
+        self.assertFalse(self.bot.last_ok)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+import threading
+import time
+
+from calendar_app.llm import LLMRequestManager, LLMCancelled, INTERACTIVE, BACKGROUND
+
+
+class _BlockingStream:
+    """Fake streaming response that only finishes once released or closed."""
+
+    def __init__(self, text, release):
+        self.text = text
+        self.release = release
+        self.closed = False
+
+    def iter_lines(self):
+        self.release.wait(5)
+        if self.closed:
+            raise ConnectionError("stream closed")
+        yield json.dumps({"response": self.text, "done": True, "context": [7]}).encode("utf-8")
+
+    def close(self):
+        self.closed = True
+        self.release.set()
+
+
+class LLMRequestManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.calls = []
+        self.streams = []
+
+    def _post(self, url, headers=None, json=None, stream=False):
+        self.calls.append(json["prompt"])
+        s = _BlockingStream(json["prompt"].upper(), self.release)
+        self.streams.append(s)
+        return s
+
+    def _wait_for_calls(self, n):
+        deadline = time.time() + 2
+        while len(self.calls) < n and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(self.calls), n)
+
+    def _in_thread(self, mgr, payload, session=None, priority=INTERACTIVE):
+        out = {}
+
+        def run():
+            try:
+                out["result"] = mgr.generate(payload, session=session, priority=priority)
+            except Exception as e:
+                out["error"] = e
+
+        t = threading.Thread(target=run)
+        t.start()
+        return t, out
+
+    def test_identical_prompts_are_coalesced(self):
+        mgr = LLMRequestManager(post=self._post)
+        t1, out1 = self._in_thread(mgr, {"prompt": "hi"}, session="a")
+        self._wait_for_calls(1)
+        t2, out2 = self._in_thread(mgr, {"prompt": "hi"}, session="b")
+        time.sleep(0.05)
+        self.release.set()
+        t1.join(2)
+        t2.join(2)
+        self.assertEqual(self.calls, ["hi"])
+        self.assertEqual(out1["result"], ("HI", [7]))
+        self.assertEqual(out2["result"], ("HI", [7]))
+
+    def test_new_message_cancels_previous_generation(self):
+        mgr = LLMRequestManager(post=self._post)
+        t1, out1 = self._in_thread(mgr, {"prompt": "first"}, session="a")
+        self._wait_for_calls(1)
+        t2, out2 = self._in_thread(mgr, {"prompt": "second"}, session="a")
+        t1.join(2)
+        self.assertIsInstance(out1.get("error"), LLMCancelled)
+        self.assertTrue(self.streams[0].closed)
+        t2.join(2)
+        self.assertEqual(out2["result"], ("SECOND", [7]))
+
+    def test_interactive_work_runs_before_background(self):
+        mgr = LLMRequestManager(max_concurrent=1, post=self._post)
+        t1, _ = self._in_thread(mgr, {"prompt": "busy"})
+        self._wait_for_calls(1)
+        t2, _ = self._in_thread(mgr, {"prompt": "background"}, priority=BACKGROUND)
+        time.sleep(0.05)
+        t3, _ = self._in_thread(mgr, {"prompt": "interactive"}, priority=INTERACTIVE)
+        time.sleep(0.05)
+        self.assertEqual(self.calls, ["busy"])
+        self.release.set()
+        for t in (t1, t2, t3):
+            t.join(2)
+        self.assertEqual(self.calls, ["busy", "interactive", "background"])
+
+
+if __name__ == '__main__':
+    unittest.main()
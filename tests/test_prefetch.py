@@ -0,0 +1,57 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import time
+
+from calendar_app.calendar import Calendar
+from calendar_app.prefetch import PeriodPrefetcher, neighbours
+
+
+class PeriodPrefetcherTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp()
+        os.close(fd)
+        self.cal = Calendar(self.db_path)
+        self.cal.add_event("Jan", "2025-01-15 09:00")
+        self.cal.add_event("Dec", "2024-12-31 09:00")
+        self.pf = PeriodPrefetcher(self.cal, max_entries=3)
+
+    def tearDown(self):
+        self.pf.close()
+        self.cal.conn.close()
+        os.unlink(self.db_path)
+
+    def _wait_cached(self, key):
+        deadline = time.time() + 2
+        while key not in self.pf._cache and time.time() < deadline:
+            time.sleep(0.01)
+        return key in self.pf._cache
+
+    def test_neighbours_wrap_years(self):
+        self.assertEqual(neighbours(("month", 2025, 1)), [("month", 2024, 12), ("month", 2025, 2)])
+        self.assertEqual(neighbours(("year", 2025)), [("year", 2024), ("year", 2026)])
+
+    def test_prefetch_fills_cache_in_background(self):
+        self.pf.prefetch(neighbours(("month", 2025, 1)))
+        self.assertTrue(self._wait_cached(("month", 2024, 12)))
+        self.assertTrue(self._wait_cached(("month", 2025, 2)))
+        self.assertEqual([e["title"] for e in self.pf.get(("month", 2024, 12))["2024-12-31"]], ["Dec"])
+
+    def test_changes_invalidate_and_cache_is_bounded(self):
+        self.assertEqual(len(self.pf.get(("month", 2025, 1))["2025-01-15"]), 1)
+        self.cal.add_event("Another", "2025-01-15 11:00")
+        self.assertEqual(len(self.pf.get(("month", 2025, 1))["2025-01-15"]), 2)
+        for m in range(2, 8):
+            self.pf.get(("month", 2025, m))
+        self.assertLessEqual(len(self.pf._cache), 3)
+
+    def test_stale_results_are_dropped(self):
+        self.pf._store(("year", 2025), {"stale": 1}, self.pf._generation - 1)
+        self.assertNotIn(("year", 2025), self.pf._cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+from calendar_app.calendar import Calendar
+from calendar_app.reminders import ReminderScheduler
+
+
+def _at(**delta):
+    return (datetime.now() + timedelta(**delta)).strftime("%Y-%m-%d %H:%M")
+
+
+class ReminderSchedulerTests(unittest.TestCase):
+    def setUp(self):
+        self.cal = Calendar(":memory:")
+        self.fired = []
+        self.got_one = threading.Event()
+
+    def tearDown(self):
+        self.cal.conn.close()
+
+    def _on_fire(self, event):
+        self.fired.append(event["title"])
+        self.got_one.set()
+
+    def test_loads_only_upcoming_events(self):
+        self.cal.add_event("Past", _at(hours=-2))
+        self.cal.add_event("Soon", _at(hours=1))
+        self.cal.add_event("Later", _at(days=3))
+        sched = ReminderScheduler(self.cal, self._on_fire, lead_minutes=120)
+        sched.start()
+        try:
+            self.assertTrue(self.got_one.wait(2))
+            self.assertEqual(self.fired, ["Soon"])
+            self.assertEqual(sched.pending(), 1)
+        finally:
+            sched.stop()
+
+    def test_tracks_adds_and_removes(self):
+        sched = ReminderScheduler(self.cal, self._on_fire, lead_minutes=120)
+        sched.start()
+        try:
+            eid = self.cal.add_event("Cancelled", _at(days=1))
+            self.assertEqual(sched.pending(), 1)
+            self.cal.remove_event(eid)
+            self.assertEqual(sched.pending(), 0)
+            self.cal.add_event("Added", _at(hours=1))
+            self.assertTrue(self.got_one.wait(2))
+            self.assertEqual(self.fired, ["Added"])
+        finally:
+            sched.stop()
+
+
+    def test_far_future_event_does_not_stop_the_worker(self):
+        self.cal.add_event("Someday", "9999-01-01 09:00")
+        sched = ReminderScheduler(self.cal, self._on_fire, lead_minutes=120)
+        sched.start()
+        try:
+            self.cal.add_event("Soon", _at(hours=1))
+            self.assertTrue(self.got_one.wait(2))
+            self.assertEqual(self.fired, ["Soon"])
+            self.assertTrue(sched._thread.is_alive())
+        finally:
+            sched.stop()
+
+    def test_failed_delivery_is_logged(self):
+        def broken(event):
+            self.got_one.set()
+            raise RuntimeError("no display")
+
+        sched = ReminderScheduler(self.cal, broken, lead_minutes=120)
+        with self.assertLogs("calendar_app.reminders", level="ERROR") as logs:
+            sched.start()
+            try:
+                self.cal.add_event("Soon", _at(hours=1))
+                self.assertTrue(self.got_one.wait(2))
+            finally:
+                sched.stop()
+        self.assertIn("no display", "\n".join(logs.output))
+
+    def test_edit_after_firing_does_not_fire_again(self):
+        sched = ReminderScheduler(self.cal, self._on_fire, lead_minutes=120)
+        sched.start()
+        try:
+            eid = self.cal.add_event("Standup", _at(hours=1))
+            self.assertTrue(self.got_one.wait(2))
+            self.got_one.clear()
+            self.cal.update_event(eid, title="Standup (room 4)")
+            self.assertEqual(sched.pending(), 0)
+            self.assertFalse(self.got_one.wait(0.2))
+            # moving it is a new reminder
+            self.cal.update_event(eid, start=_at(hours=1, minutes=30))
+            self.assertTrue(self.got_one.wait(2))
+            self.assertEqual(self.fired, ["Standup", "Standup (room 4)"])
+        finally:
+            sched.stop()
+
+    def test_reload_picks_up_other_writers(self):
+        with tempfile.TemporaryDirectory() as d:
+            cal = Calendar(os.path.join(d, "calendar.db"))
+            sched = ReminderScheduler(cal, self._on_fire, lead_minutes=120)
+            sched.start()
+            try:
+                cal.add_event("Here", _at(hours=1))
+                self.assertTrue(self.got_one.wait(2))
+                version = cal.data_version()
+                other = Calendar(cal.db_path)
+                other.add_event("Elsewhere", _at(days=1))
+                other.conn.close()
+                self.assertNotEqual(cal.data_version(), version)
+                sched.reload()
+                # the one that already fired is not queued again
+                self.assertEqual(sched.pending(), 1)
+                self.assertEqual(self.fired, ["Here"])
+            finally:
+                sched.stop()
+                cal.conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import date
+
+from calendar_app.calendar import Calendar
+from calendar_app.retrieval import build_context, resolve_range, estimate_tokens
+
+TODAY = date(2025, 11, 19)  # a Wednesday
+
+
+class RetrievalTests(unittest.TestCase):
+    def setUp(self):
+        self.cal = Calendar(":memory:")
+
+    def tearDown(self):
+        self.cal.conn.close()
+
+    def test_resolve_range(self):
+        self.assertEqual(resolve_range("what do I have tomorrow?", TODAY), (date(2025, 11, 20), date(2025, 11, 21)))
+        self.assertEqual(resolve_range("anything next week", TODAY), (date(2025, 11, 24), date(2025, 12, 1)))
+        self.assertEqual(resolve_range("plans on friday?", TODAY), (date(2025, 11, 21), date(2025, 11, 22)))
+        self.assertIsNone(resolve_range("tell me a joke", TODAY))
+
+    def test_only_the_requested_window_is_included(self):
+        self.cal.add_event("Standup", "2025-11-20 09:00")
+        self.cal.add_event("Review", "2025-11-20 14:00")
+        self.cal.add_event("Dentist", "2025-11-25 10:00")
+        ctx = build_context(self.cal, "what do I have tomorrow?", today=TODAY)
+        self.assertIn("Standup", ctx)
+        self.assertIn("Review", ctx)
+        self.assertNotIn("Dentist", ctx)
+
+    def test_keyword_lookup(self):
+        self.cal.add_event("Dentist", "2025-11-25 10:00")
+        self.cal.add_event("Standup", "2025-11-26 09:00")
+        ctx = build_context(self.cal, "when is my dentist appointment?", today=TODAY)
+        self.assertIn("Dentist", ctx)
+        self.assertNotIn("Standup", ctx)
+
+    def test_budget_is_respected(self):
+        for h in range(24):
+            for m in (0, 15, 30, 45):
+                self.cal.add_event(f"Meeting {h}-{m}", f"2025-11-20 {h:02d}:{m:02d}")
+        ctx = build_context(self.cal, "tomorrow", max_tokens=50, today=TODAY)
+        self.assertLessEqual(estimate_tokens(ctx), 60)
+        self.assertIn("more events not shown", ctx)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+import threading
+from unittest import mock
+
+from calendar_app import router as router_module
+from calendar_app.calendar import Calendar
+from calendar_app.chatbot import ChatBot
+from calendar_app.router import CalendarRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CalendarRouterTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.router = CalendarRouter(self.tmp.name, max_open=2, idle_timeout=60, clock=self.clock)
+
+    def tearDown(self):
+        self.router.close()
+        self.tmp.cleanup()
+
+    def test_chatbot_works_on_a_routed_calendar(self):
+        alice = ChatBot(self.router.calendar("alice"), llm_enabled=False)
+        bob = ChatBot(self.router.calendar("bob"), llm_enabled=False)
+        alice.respond("add Standup on 2025-11-20 at 09:00")
+        bob.respond("add Gym on 2025-11-20 at 07:00")
+        self.assertIn("Standup", alice.respond("list"))
+        self.assertNotIn("Gym", alice.respond("list"))
+        self.assertEqual(self.router.calendar_ids(), ["alice", "bob"])
+
+    def test_pool_is_bounded_and_idle_shards_close(self):
+        for cid in ("a", "b", "c"):
+            self.router.calendar(cid).add_event("x", "2025-11-20 09:00")
+        self.assertEqual(list(self.router._pool), ["b", "c"])
+        self.clock.now = 120
+        self.router.evict_idle()
+        self.assertEqual(list(self.router._pool), [])
+        # evicted calendars reopen transparently
+        self.assertEqual(len(self.router.calendar("a").list_events()), 1)
+
+    def test_fan_out_merges_by_start(self):
+        self.router.calendar("alice").add_event("Lunch", "2025-11-20 12:00")
+        self.router.calendar("bob").add_event("Gym", "2025-11-20 07:00")
+        self.router.calendar("carol").add_event("Review", "2025-11-20 15:00")
+        self.router.calendar("carol").add_event("Other day", "2025-11-21 15:00")
+        events = self.router.events_on("2025-11-20")
+        self.assertEqual([(e["calendar"], e["title"]) for e in events],
+                         [("bob", "Gym"), ("alice", "Lunch"), ("carol", "Review")])
+
+    def test_slow_shard_open_does_not_block_other_shards(self):
+        opening, release = threading.Event(), threading.Event()
+
+        class SlowCalendar(Calendar):
+            def __init__(self, path, **kwargs):
+                if path.endswith("slow.db"):
+                    opening.set()
+                    release.wait(5)
+                super().__init__(path, **kwargs)
+
+        with mock.patch.object(router_module, "Calendar", SlowCalendar):
+            t = threading.Thread(target=self.router.calendar("slow").list_events)
+            t.start()
+            self.assertTrue(opening.wait(2))
+            try:
+                self.router.calendar("fast").add_event("x", "2025-11-20 09:00")
+                self.assertEqual(list(self.router._pool), ["fast"])
+            finally:
+                release.set()
+                t.join(2)
+        self.assertEqual(list(self.router._pool), ["fast", "slow"])
+
+    def test_concurrent_opens_share_one_shard(self):
+        threads = [threading.Thread(target=self.router.calendar("alice").list_events) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(list(self.router._pool), ["alice"])
+        self.assertEqual(self.router._pool["alice"].users, 0)
+
+    def test_fan_out_reads_unpooled_shards_without_schema_setup(self):
+        self.router.calendar("alice").add_event("Lunch", "2025-11-20 12:00")
+        self.clock.now = 120
+        self.router.evict_idle()
+        with mock.patch("calendar_app.calendar.init_db", side_effect=AssertionError("init_db")):
+            events = self.router.events_on("2025-11-20")
+        self.assertEqual([e["title"] for e in events], ["Lunch"])
+        self.assertEqual(list(self.router._pool), [])
+
+    def test_rejects_unsafe_ids(self):
+        with self.assertRaises(ValueError):
+            self.router.calendar("../etc")
+
+
+if __name__ == '__main__':
+    unittest.main()
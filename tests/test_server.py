@@ -0,0 +1,108 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import http.client
+import json
+import tempfile
+import threading
+import time
+
+from calendar_app.router import CalendarRouter
+from calendar_app.server import CalendarHTTPServer
+
+
+class CalendarServerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.router = CalendarRouter(self.tmp.name, max_open=4)
+        self.server = CalendarHTTPServer(("127.0.0.1", 0), self.router)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.conn = http.client.HTTPConnection("127.0.0.1", self.server.server_port, timeout=5)
+
+    def tearDown(self):
+        self.conn.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.router.close()
+        self.tmp.cleanup()
+
+    def _call(self, method, path, body=None):
+        self.conn.request(method, path, body=json.dumps(body) if body is not None else None)
+        resp = self.conn.getresponse()
+        return resp.status, json.loads(resp.read())
+
+    def test_batch_and_range_over_one_connection(self):
+        status, out = self._call("POST", "/events/batch", {
+            "calendar": "alice",
+            "add": [{"title": f"E{i}", "start": f"2025-11-{10 + i} 09:00"} for i in range(5)],
+        })
+        self.assertEqual(status, 200)
+        self.assertEqual(len(out["added"]), 5)
+
+        status, out = self._call("GET", "/events?calendar=alice&start=2025-11-11&end=2025-11-13")
+        self.assertEqual([e["title"] for e in out["events"]], ["E1", "E2"])
+
+        status, out = self._call("POST", "/events/batch", {
+            "calendar": "alice", "update": [{"id": 2, "title": "E1 (edited)"}, {"id": 98, "title": "x"}],
+            "remove": [1, 99],
+        })
+        self.assertEqual(out["updated"], [2])
+        self.assertEqual(out["removed"], [True, False])
+
+        status, out = self._call("GET", "/everyone?date=2025-11-12")
+        self.assertEqual([(e["calendar"], e["title"]) for e in out["events"]], [("alice", "E2")])
+        status, out = self._call("GET", "/events?calendar=alice&date=2025-11-11")
+        self.assertEqual([e["title"] for e in out["events"]], ["E1 (edited)"])
+
+    def test_batch_removes_archived_events_after_adds(self):
+        self.router.calendar("alice").add_event("Old", "2022-03-01 09:00")
+        self.router.calendar("alice").archive_before(2025)
+        # Evict idle shards before every checkout, as a busy pool would
+        self.router.idle_timeout = 0
+        checkout = self.router._checkout
+        self.router._checkout = lambda cid: (self.router.evict_idle(), checkout(cid))[1]
+        status, out = self._call("POST", "/events/batch", {
+            "calendar": "alice", "add": [{"title": "New", "start": "2025-11-12 09:00"}], "remove": [1],
+        })
+        self.assertEqual(status, 200, out)
+        self.assertEqual(out["removed"], [True])
+        status, out = self._call("GET", "/events?calendar=alice")
+        self.assertEqual([e["title"] for e in out["events"]], ["New"])
+
+    def test_more_clients_than_pool_slots(self):
+        # Idle keep-alive connections must not block other clients (max_open=4)
+        conns = [http.client.HTTPConnection("127.0.0.1", self.server.server_port, timeout=5) for _ in range(6)]
+        try:
+            for c in conns:
+                c.request("GET", "/health")
+                self.assertEqual(c.getresponse().read(), b'{"ok": true}')
+            started = time.monotonic()
+            conns[-1].request("GET", "/health")
+            conns[-1].getresponse().read()
+            self.assertLess(time.monotonic() - started, 1.0)
+        finally:
+            for c in conns:
+                c.close()
+
+    def test_chat_and_errors(self):
+        status, out = self._call("POST", "/chat", {"calendar": "bob", "message": "add Gym on 2025-11-20 at 07:00"})
+        self.assertEqual(status, 200)
+        self.assertTrue(out["ok"])
+        status, out = self._call("POST", "/chat", {"calendar": "bob", "message": "hello there"})
+        self.assertFalse(out["ok"])
+        status, _ = self._call("GET", "/nope")
+        self.assertEqual(status, 404)
+        # the unrouted POST's body is consumed, so the connection stays usable
+        status, _ = self._call("POST", "/nope", {"calendar": "bob", "message": "GET /health HTTP/1.1"})
+        self.assertEqual(status, 404)
+        status, out = self._call("GET", "/health")
+        self.assertEqual((status, out), (200, {"ok": True}))
+        status, _ = self._call("GET", "/events?calendar=../x")
+        self.assertEqual(status, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
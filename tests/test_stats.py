@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from calendar_app.calendar import Calendar
+from calendar_app.chatbot import ChatBot
+from calendar_app.stats import ScheduleStats
+
+
+class ScheduleStatsTests(unittest.TestCase):
+    def setUp(self):
+        self.cal = Calendar(":memory:")
+        self.cal.add_event("Mon standup", "2025-11-17 09:00", "2025-11-17 09:30")
+        self.cal.add_event("Mon review", "2025-11-17 14:00", "2025-11-17 15:30")
+        self.cal.add_event("Tue standup", "2025-11-18 09:00")
+        self.cal.add_event("Old", "1969-12-31 23:00", "1970-01-01 00:00")
+
+    def tearDown(self):
+        self.cal.conn.close()
+
+    def _check(self, stats):
+        hours = stats.hour_histogram()
+        self.assertEqual(hours[9], 2)
+        self.assertEqual(hours[14], 1)
+        self.assertEqual(hours[23], 1)
+        self.assertEqual(stats.weekday_histogram(), [2, 1, 1, 0, 0, 0, 0])
+        avg, n = stats.average_length_minutes()
+        self.assertEqual(n, 3)
+        self.assertAlmostEqual(avg, 60.0)
+
+    def test_totals(self):
+        self._check(ScheduleStats.load(self.cal))
+
+    def test_odd_start_values_do_not_break_stats(self):
+        self.cal.conn.execute("INSERT INTO events (title, start) VALUES ('Odd', '2025-11-1'), ('Junk', 'soon')")
+        self._check(ScheduleStats.load(self.cal))
+
+    def test_range_and_command(self):
+        stats = ScheduleStats.load(self.cal, "2025-11-18", "2025-11-19")
+        self.assertEqual(stats.count, 1)
+        bot = ChatBot(self.cal, llm_enabled=False)
+        reply = bot.respond("stats from 2025-11-17 to 2025-11-18")
+        self.assertIn("Busiest hours: 09:00 (2), 14:00 (1)", reply)
+        self.assertIn("Mon 2, Tue 1", reply)
+        self.assertIn("Average event length: 60 min", reply)
+        self.assertTrue(bot.respond("stats length").startswith("Average event length"))
+        bot.respond("stats sideways")
+        self.assertFalse(bot.last_ok)
+
+
+if __name__ == '__main__':
+    unittest.main()
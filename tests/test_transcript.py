@@ -0,0 +1,33 @@
+import unittest
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import tempfile
+
+from calendar_app.transcript import TranscriptLog, collapse, format_matches
+
+
+class TranscriptTests(unittest.TestCase):
+    def test_collapse(self):
+        text = "\n".join(f"line {i}" for i in range(10))
+        self.assertEqual(collapse(text, 20), (text, 0))
+        shown, hidden = collapse(text, 3)
+        self.assertEqual(shown, "line 0\nline 1\nline 2")
+        self.assertEqual(hidden, 7)
+
+    def test_log_search(self):
+        with tempfile.TemporaryDirectory() as d:
+            log = TranscriptLog(os.path.join(d, "history.log"))
+            log.append("You", "add Dentist on 2025-11-20")
+            log.append("Bot", "Added event #1: Dentist\nat 2025-11-20")
+            log.append("You", "list")
+            matches = log.search("dentist")
+            self.assertEqual([m["who"] for m in matches], ["You", "Bot"])
+            self.assertEqual(len(log.search("dentist", limit=1)), 1)
+            self.assertIn("Dentist at 2025-11-20", format_matches(matches))
+            self.assertEqual(log.search("nothing"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()